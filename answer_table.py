@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import os
+import struct
+from itertools import combinations
+from math import comb
+
+import numpy
+
+from binfile import aligned, padded, write_atomic
+from operator_index import load_index
+from tags import arknights_tags_by_category
+
+TABLE_MAGIC = b"AKRT"
+TABLE_VERSION = 1
+ROLL_SIZE = 5
+MAX_ENTRIES = 0xFFFF
+# magic, version, rolls, vocabulary tags, entries, roll refs, operator refs, sha256 of CSV and vocabulary
+HEADER = struct.Struct('<4sHIHIII32s')
+
+
+def roll_vocabulary():
+    # Every tag a recruitment roll can show, in a fixed order
+    return [tag for tags in arknights_tags_by_category.values() for tag in tags]
+
+
+def colex_rank(positions):
+    # Dense rank of a sorted set of vocabulary positions among all sets of its size
+    return sum(comb(position, i + 1) for i, position in enumerate(positions))
+
+
+def table_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".rolls"
+
+
+def source_signature(csv_path, vocabulary):
+    digest = hashlib.sha256(f"{TABLE_VERSION}\0{ROLL_SIZE}\0".encode())
+    digest.update("\0".join(vocabulary).encode('utf-8'))
+    with open(csv_path, 'rb') as f:
+        digest.update(f.read())
+    return digest.digest()
+
+
+def compile_table(csv_path):
+    # Evaluates every ROLL_SIZE-tag roll of the vocabulary against the roster.
+    # Each distinct (tag combination, Top Operator allowed) answer becomes one
+    # entry; a roll is its entries in the order TagMatcher.match ranks them.
+    from matcher import TOP_OPERATOR_TAG, order_groups, rank_operators
+
+    index = load_index(csv_path)
+    masks, rarities = index['masks'], index['rarities']
+    tag_bits = {tag: bit for bit, tag in enumerate(index['tags'])}
+    vocabulary = roll_vocabulary()
+    roll_count = comb(len(vocabulary), ROLL_SIZE)
+
+    hits = {}
+    answers = {}
+    entries = {}
+    entry_masks, entry_rarities, entry_first, entry_operators = [], [], [], []
+    no_operators = numpy.zeros(0, dtype=numpy.intp)
+
+    def operators_with(mask):
+        # Operators carrying every tag in mask; supersets of an empty combination are skipped
+        idx = hits.get(mask)
+        if idx is None:
+            rest = mask & (mask - 1)
+            if rest and not operators_with(rest).size:
+                idx = no_operators
+            else:
+                idx = numpy.flatnonzero((masks & numpy.uint64(mask)) == mask)
+            hits[mask] = idx
+        return idx
+
+    def entry_for(mask, top_allowed):
+        idx = operators_with(mask)
+        if idx.size and not top_allowed:
+            idx = idx[rarities[idx] != 6]
+        if not idx.size:
+            return None
+        # Rolls without Top Operator share the entry when no 6-star is involved
+        key = (mask, top_allowed and bool((rarities[idx] == 6).any()))
+        entry = entries.get(key)
+        if entry is None:
+            ranked, lowest_rarity = rank_operators(idx, rarities)
+            entry = entries[key] = len(entry_masks)
+            entry_masks.append(mask)
+            entry_rarities.append(lowest_rarity)
+            entry_first.append(int(idx[0]))
+            entry_operators.append(ranked)
+        return entry
+
+    rows = [None] * roll_count
+    for positions in combinations(range(len(vocabulary)), ROLL_SIZE):
+        roll = [vocabulary[p] for p in positions]
+        # Combination order as in rank_combos: tags by roster bit, sizes ascending
+        values = sorted(1 << tag_bits[t] for t in roll if t in tag_bits)
+        top_allowed = TOP_OPERATOR_TAG in roll
+        groups = []
+        order = 0
+        for r in range(1, len(values) + 1):
+            for combo in combinations(values, r):
+                key = (sum(combo), top_allowed)
+                if key in answers:
+                    entry = answers[key]
+                else:
+                    entry = answers[key] = entry_for(*key)
+                if entry is not None:
+                    groups.append(((entry_first[entry], order), entry_rarities[entry], r, entry))
+                order += 1
+        rows[colex_rank(positions)] = order_groups(groups)
+
+    if len(entry_masks) > MAX_ENTRIES or len(index['ids']) > MAX_ENTRIES:
+        raise ValueError("Roster is too large for a 16-bit answer table")
+    entry_rarities_array = numpy.array(entry_rarities, dtype=numpy.uint8)
+    roll_offsets = numpy.zeros(roll_count + 1, dtype=numpy.uint32)
+    roll_offsets[1:] = numpy.cumsum([len(row) for row in rows])
+    roll_entries = numpy.fromiter((entry for row in rows for entry in row), dtype=numpy.uint16,
+                                  count=int(roll_offsets[-1]))
+    # Best guaranteed rarity per roll: the maximum over its entries
+    roll_rarities = numpy.zeros(roll_count, dtype=numpy.uint8)
+    filled = numpy.flatnonzero(numpy.diff(roll_offsets))
+    roll_rarities[filled] = numpy.maximum.reduceat(entry_rarities_array[roll_entries], roll_offsets[filled])
+    offsets = numpy.zeros(len(entry_operators) + 1, dtype=numpy.uint32)
+    offsets[1:] = numpy.cumsum([len(ops) for ops in entry_operators])
+    return {
+        'signature': source_signature(csv_path, vocabulary),
+        'vocabulary': vocabulary,
+        'roll_rarities': roll_rarities,
+        'roll_offsets': roll_offsets,
+        'roll_entries': roll_entries,
+        'entry_masks': numpy.array(entry_masks, dtype=numpy.uint64),
+        'entry_rarities': entry_rarities_array,
+        'entry_offsets': offsets,
+        'entry_operators': (numpy.concatenate(entry_operators) if entry_operators
+                            else numpy.zeros(0, dtype=numpy.int64)).astype(numpy.uint16)
+    }
+
+
+def pack_table(arrays):
+    # Header, NUL-joined vocabulary, then 8-byte aligned raw arrays
+    vocabulary = "\0".join(arrays['vocabulary']).encode('utf-8')
+    header = HEADER.pack(TABLE_MAGIC, TABLE_VERSION, len(arrays['roll_rarities']), len(arrays['vocabulary']),
+                         len(arrays['entry_masks']), len(arrays['roll_entries']), len(arrays['entry_operators']),
+                         arrays['signature'])
+    head = header + struct.pack('<I', len(vocabulary)) + vocabulary
+    return b"".join(padded(part) for part in (
+        head, arrays['entry_masks'].tobytes(), arrays['roll_offsets'].tobytes(), arrays['entry_offsets'].tobytes(),
+        arrays['roll_entries'].tobytes(), arrays['entry_operators'].tobytes(), arrays['roll_rarities'].tobytes(),
+        arrays['entry_rarities'].tobytes()))
+
+
+def write_table(data, table_path):
+    return write_atomic(table_path, data)
+
+
+def build_table(csv_path, table_path=None):
+    return write_table(pack_table(compile_table(csv_path)), table_path or table_path_for(csv_path))
+
+
+class AnswerTable:
+    # Every possible roll's ranked combinations, looked up by the colex rank
+    # of its tags: one row read and no roster scan per scan. buffer is a
+    # memory map of the table file or the packed bytes themselves.
+    def __init__(self, buffer):
+        magic, version, rolls, vocab_size, entries, roll_refs, refs, self.signature = HEADER.unpack_from(buffer)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            raise ValueError("Answer table has an unknown format or version")
+        (vocab_length,) = struct.unpack_from('<I', buffer, HEADER.size)
+        start = HEADER.size + 4
+        self.vocabulary = bytes(buffer[start:start + vocab_length]).decode('utf-8').split("\0") if vocab_size else []
+        self.positions = {tag: i for i, tag in enumerate(self.vocabulary)}
+        offset = aligned(start + vocab_length)
+
+        def array(dtype, count):
+            nonlocal offset
+            values = numpy.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+            offset += aligned(values.nbytes)
+            return values
+
+        self.entry_masks = array(numpy.uint64, entries)
+        self.roll_offsets = array(numpy.uint32, rolls + 1)
+        self.entry_offsets = array(numpy.uint32, entries + 1)
+        self.roll_entries = array(numpy.uint16, roll_refs)
+        self.entry_operators = array(numpy.uint16, refs)
+        self.roll_rarities = array(numpy.uint8, rolls)
+        self.entry_rarities = array(numpy.uint8, entries)
+        self._groups = {}
+
+    def roll_rank(self, tags):
+        # -> row of a ROLL_SIZE-tag roll, or None for partial or unknown rolls
+        positions = [self.positions.get(tag) for tag in dict.fromkeys(tags)]
+        if len(positions) != ROLL_SIZE or None in positions:
+            return None
+        return colex_rank(sorted(positions))
+
+    def guaranteed_rarity(self, tags):
+        rank = self.roll_rank(tags)
+        return None if rank is None else int(self.roll_rarities[rank])
+
+    def group(self, entry, operators, tag_names):
+        # Built once per entry and shared by every roll that contains it
+        group = self._groups.get(entry)
+        if group is None:
+            mask = int(self.entry_masks[entry])
+            tags = [tag for bit, tag in enumerate(tag_names) if mask >> bit & 1]
+            start, end = self.entry_offsets[entry], self.entry_offsets[entry + 1]
+            group = self._groups[entry] = {
+                'match_count': len(tags),
+                'tags': tags,
+                'lowest_rarity': int(self.entry_rarities[entry]),
+                'operators': [operators[i] for i in self.entry_operators[start:end].tolist()]
+            }
+        return group
+
+    def lookup(self, tags, operators, tag_names):
+        # -> TagMatcher.match's answer for a full roll, None when the table cannot answer
+        rank = self.roll_rank(tags)
+        if rank is None:
+            return None
+        start, end = self.roll_offsets[rank], self.roll_offsets[rank + 1]
+        return [self.group(entry, operators, tag_names) for entry in self.roll_entries[start:end].tolist()]
+
+
+def load_table(csv_path, table_path=None):
+    # Maps the table, rebuilding it when it is missing, from another version,
+    # or the CSV or tag vocabulary changed. A table that cannot be written
+    # (read-only directory, or the old file is still mapped) is used from memory.
+    table_path = table_path or table_path_for(csv_path)
+    try:
+        table = AnswerTable(numpy.memmap(table_path, dtype=numpy.uint8, mode='r'))
+        if os.path.getmtime(csv_path) <= os.path.getmtime(table_path) and table.vocabulary == roll_vocabulary():
+            return table
+        signature = source_signature(csv_path, roll_vocabulary())
+        if table.signature == signature:
+            os.utime(table_path)
+            return table
+        del table
+    except (OSError, ValueError, struct.error):
+        pass
+    data = pack_table(compile_table(csv_path))
+    try:
+        write_table(data, table_path)
+    except OSError:
+        return AnswerTable(data)
+    return AnswerTable(numpy.memmap(table_path, dtype=numpy.uint8, mode='r'))
+
+
+def rolls_containing(table):
+    # How many rolls list each entry
+    return numpy.bincount(table.roll_entries, minlength=len(table.entry_masks))
+
+
+def main(argv=None):
+    from matcher import DEFAULT_CSV_PATH
+    parser = argparse.ArgumentParser(prog="python -m answer_table", description="Build the answer table for every possible roll and report which rolls guarantee high rarities.")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="roster CSV to evaluate")
+    parser.add_argument('--top', type=int, default=20, help="guaranteeing combinations to list")
+    args = parser.parse_args(argv)
+
+    path = build_table(args.csv)
+    table = AnswerTable(numpy.memmap(path, dtype=numpy.uint8, mode='r'))
+    tag_names = load_index(args.csv)['tags']
+    rolls = len(table.roll_rarities)
+    print(f"Answer table written to {path}: {rolls} rolls, {len(table.entry_masks)} distinct answers, "
+          f"{len(table.roll_entries) / rolls:.1f} combinations per roll, {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+    for rarity in (6, 5, 4):
+        count = int((table.roll_rarities >= rarity).sum())
+        print(f"Rolls guaranteeing {rarity}★ or better: {count} ({count / rolls:.2%})")
+
+    counts = rolls_containing(table)
+    for rarity in (6, 5):
+        picks = [entry for entry in numpy.argsort(-counts, kind='stable') if table.entry_rarities[entry] == rarity]
+        print(f"\nCombinations guaranteeing {rarity}★ (rolls that offer them):")
+        for entry in picks[:args.top]:
+            mask = int(table.entry_masks[entry])
+            tags = [tag for bit, tag in enumerate(tag_names) if mask >> bit & 1]
+            print(f"  {' + '.join(tags)}: {counts[entry]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import struct
+
+import numpy
+from PIL import Image
+
+from binfile import aligned, padded, write_atomic
+from operator_index import DEFAULT_AVATAR_DIR, load_index
+
+ATLAS_MAGIC = b"AKAT"
+ATLAS_VERSION = 1
+DEFAULT_THUMB_SIZE = 64
+DEFAULT_ATLAS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "avatars.atlas")
+# magic, version, thumbnails, thumbnail edge, sha256 of the sources
+HEADER = struct.Struct('<4sHIH32s')
+
+
+def source_signature(avatars, avatar_dir, size):
+    # Which files, their sizes and mtimes, and the thumbnail size
+    digest = hashlib.sha256(str(size).encode())
+    for op_id, filename in avatars:
+        stat = os.stat(os.path.join(avatar_dir, filename))
+        digest.update(f"{op_id}\0{filename}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return digest.digest()
+
+
+def roster_avatars(csv_path=None, avatar_dir=DEFAULT_AVATAR_DIR):
+    # (operator id, default avatar file) for every roster entry whose image is on disk
+    from matcher import DEFAULT_CSV_PATH
+    index = load_index(csv_path or DEFAULT_CSV_PATH)
+    return [(op_id, avatar) for op_id, avatar in zip(index['ids'], index['avatars'])
+            if avatar and os.path.isfile(os.path.join(avatar_dir, avatar))]
+
+
+def build_atlas(avatars=None, avatar_dir=DEFAULT_AVATAR_DIR, atlas_path=DEFAULT_ATLAS_PATH, size=DEFAULT_THUMB_SIZE):
+    # Header, NUL-joined ids, then one size x size RGBA tile per id at an 8-byte aligned offset
+    avatars = roster_avatars(avatar_dir=avatar_dir) if avatars is None else avatars
+    ids = "\0".join(op_id for op_id, _ in avatars).encode('utf-8')
+    tiles = numpy.zeros((len(avatars), size, size, 4), dtype=numpy.uint8)
+    for i, (_, filename) in enumerate(avatars):
+        with Image.open(os.path.join(avatar_dir, filename)) as image:
+            tiles[i] = numpy.asarray(image.convert('RGBA').resize((size, size), Image.LANCZOS))
+    header = HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, len(avatars), size, source_signature(avatars, avatar_dir, size))
+    head = header + struct.pack('<I', len(ids)) + ids
+    return write_atomic(atlas_path, padded(head) + tiles.tobytes())
+
+
+class AvatarAtlas:
+    # Memory-mapped tiles: looking up a portrait is an index into the map,
+    # no file open or PNG decode per operator.
+    def __init__(self, atlas_path=DEFAULT_ATLAS_PATH):
+        self.path = atlas_path
+        with open(atlas_path, 'rb') as f:
+            head = f.read(HEADER.size + 4)
+            magic, version, count, size, self.signature = HEADER.unpack_from(head)
+            if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+                raise ValueError("Avatar atlas has an unknown format or version")
+            (ids_length,) = struct.unpack_from('<I', head, HEADER.size)
+            ids = f.read(ids_length).decode('utf-8').split("\0") if count else []
+        self.size = size
+        self.slots = {op_id: i for i, op_id in enumerate(ids)}
+        offset = aligned(HEADER.size + 4 + ids_length)
+        if count:
+            self.tiles = numpy.memmap(atlas_path, dtype=numpy.uint8, mode='r', offset=offset, shape=(count, size, size, 4))
+        else:
+            # mmap cannot map an empty region
+            self.tiles = numpy.empty((0, size, size, 4), dtype=numpy.uint8)
+
+    def __contains__(self, op_id):
+        return op_id in self.slots
+
+    def tile(self, op_id):
+        slot = self.slots.get(op_id)
+        return None if slot is None else self.tiles[slot]
+
+
+def load_atlas(atlas_path=DEFAULT_ATLAS_PATH, avatar_dir=DEFAULT_AVATAR_DIR, size=DEFAULT_THUMB_SIZE):
+    # Rebuilds when the atlas is missing, from another version, or the roster
+    # or avatar files changed; returns None when there are no avatars at all.
+    if not os.path.isdir(avatar_dir):
+        return None
+    avatars = roster_avatars(avatar_dir=avatar_dir)
+    if not avatars:
+        return None
+    signature = source_signature(avatars, avatar_dir, size)
+    try:
+        atlas = AvatarAtlas(atlas_path)
+        if atlas.signature == signature:
+            return atlas
+        del atlas
+    except (OSError, ValueError, struct.error):
+        pass
+    try:
+        build_atlas(avatars, avatar_dir, atlas_path, size)
+    except OSError:
+        return None
+    return AvatarAtlas(atlas_path)
+
+
+def main():
+    path = build_atlas()
+    atlas = AvatarAtlas(path)
+    print(f"Avatar atlas written to {path}: {len(atlas.slots)} portraits at {atlas.size}px, "
+          f"{os.path.getsize(path) / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
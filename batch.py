@@ -0,0 +1,200 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from PIL import Image
+
+import ocr_backend
+import pipeline
+from answer_table import load_table
+from capture import IMAGE_EXTENSIONS
+from localize import TagBoxLocator
+from matcher import DEFAULT_CSV_PATH, TagMatcher
+from ocr_cache import OCRCache
+from ocr_cascade import TIERS, OCRCascade
+from ocr_profile import PROFILE_NAMES, LanguageLock
+from template_ocr import TemplateRecognizer
+
+
+_worker_matcher = None
+_worker_recognizer = None
+_worker_cache = None
+_worker_locator = None
+_worker_language = None
+_worker_cascade = None
+
+
+def collect_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(item, name))
+        else:
+            paths.extend(sorted(glob.glob(item, recursive=True)))
+    return list(dict.fromkeys(paths))
+
+
+def init_worker(csv_path, backend_name, use_templates, cache_db, use_grid, ocr_profile="auto", use_cascade=False):
+    # One warm context per process: roster and OCR engine loaded once.
+    global _worker_matcher, _worker_recognizer, _worker_cache, _worker_locator, _worker_language, _worker_cascade
+    _worker_matcher = TagMatcher(csv_path)
+    _worker_recognizer = TemplateRecognizer() if use_templates else None
+    _worker_cache = OCRCache(db_path=cache_db)
+    _worker_locator = None if use_grid else TagBoxLocator()
+    _worker_language = LanguageLock(ocr_profile)
+    _worker_cascade = OCRCascade() if use_cascade else None
+    ocr_backend.set_backend_name(backend_name)
+    ocr_backend.get_backend(_worker_language.profile()).warm_up()
+
+
+def make_record(path, result, timings):
+    record = {'path': path, 'pid': os.getpid()}
+    record.update(pipeline.result_summary(result))
+    record['timings'] = timings
+    return record
+
+
+def process_path(path):
+    start = time.perf_counter()
+    try:
+        with Image.open(path) as image:
+            image.load()
+            load_ms = (time.perf_counter() - start) * 1000
+            result = pipeline.recognize_image(image, matcher=_worker_matcher, recognizer=_worker_recognizer,
+                                              cache=_worker_cache, locator=_worker_locator, language=_worker_language,
+                                              cascade=_worker_cascade)
+    except Exception as e:
+        return {'path': path, 'error': str(e)}
+
+    timings = result['timings']
+    timings['load'] = round(load_ms, 3)
+    timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+    return make_record(path, result, timings)
+
+
+def process_paths(paths):
+    # A group of screenshots whose remaining blocks share one stitched OCR pass
+    start = time.perf_counter()
+    records = {}
+    loaded = []
+    for path in paths:
+        try:
+            with Image.open(path) as image:
+                loaded.append((path, image.convert('RGB')))
+        except Exception as e:
+            records[path] = {'path': path, 'error': str(e)}
+    load_ms = (time.perf_counter() - start) * 1000
+    try:
+        results = pipeline.recognize_batch([image for _, image in loaded], matcher=_worker_matcher,
+                                           recognizer=_worker_recognizer, cache=_worker_cache,
+                                           locator=_worker_locator, language=_worker_language)
+    except Exception as e:
+        results = None
+        for path, _ in loaded:
+            records[path] = {'path': path, 'error': str(e)}
+    if results is not None:
+        total_ms = (time.perf_counter() - start) * 1000
+        for (path, _), result in zip(loaded, results):
+            timings = result['timings']
+            timings['load'] = round(load_ms, 3)
+            timings['total'] = round(total_ms, 3)
+            records[path] = make_record(path, result, timings)
+    return [records[path] for path in paths]
+
+
+def run_batch(paths, workers=None, csv_path=DEFAULT_CSV_PATH, backend_name="auto", use_templates=False,
+              cache_db=None, use_grid=False, ocr_profile="auto", stitch=0, use_cascade=False, out=sys.stdout,
+              tier_counts=None):
+    # stitch > 0 hands each worker that many screenshots at a time and reads
+    # their blocks in one stitched OCR call; the group's load and total times
+    # are shared by all of its records. tier_counts, if given, is filled with
+    # the number of blocks each cascade tier settled.
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 4
+    failures = 0
+    pending = set()
+    path_iter = iter(paths)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(csv_path, backend_name, use_templates, cache_db, use_grid, ocr_profile, use_cascade)) as executor:
+        def submit_next():
+            for path in path_iter:
+                if stitch:
+                    group = [path] + list(islice(path_iter, stitch - 1))
+                    pending.add(executor.submit(process_paths, group))
+                else:
+                    pending.add(executor.submit(process_path, path))
+                if len(pending) >= max_in_flight:
+                    return
+
+        submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                records = future.result()
+                for record in records if isinstance(records, list) else [records]:
+                    if 'error' in record:
+                        failures += 1
+                    elif tier_counts is not None:
+                        for block in record['blocks']:
+                            if block['tier']:
+                                tier_counts[block['tier']] = tier_counts.get(block['tier'], 0) + 1
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            submit_next()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch", description="Score recruitment screenshots without the GUI and stream JSONL results to stdout.")
+    parser.add_argument('inputs', nargs='+', help="screenshot files, directories or glob patterns")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="roster CSV to match against")
+    parser.add_argument('--templates', action='store_true', help="classify blocks against tag templates first, OCR only low-confidence ones")
+    parser.add_argument('--grid', action='store_true', help="split the panel into the fixed 3x2 grid instead of detecting tag boxes")
+    parser.add_argument('--cache-db', default=None, help="SQLite file to persist OCR results across runs")
+    parser.add_argument('--ocr-backend', choices=ocr_backend.BACKEND_NAMES, default="auto", help="OCR engine (default: tesserocr if installed, else pytesseract)")
+    parser.add_argument('--ocr-profile', choices=PROFILE_NAMES, default="auto", help="OCR language profile (default: lock to the client language after the first hit)")
+    parser.add_argument('--stitch', type=int, default=0, metavar='N', help="read the blocks of N screenshots at a time in one stitched OCR call (default: one call per block)")
+    parser.add_argument('--cascade', action='store_true', help="read each block cheaply first and escalate only unclear ones (fast tier needs tesserocr and a locked language)")
+    args = parser.parse_args(argv)
+
+    paths = collect_paths(args.inputs)
+    if not paths:
+        print("No screenshots found.", file=sys.stderr)
+        return 1
+    try:
+        backend = ocr_backend.create_backend(args.ocr_backend, pool_size=1)
+        backend.warm_up()
+        backend.close()
+    except Exception:
+        print("Tesseract OCR not found! Please install it with Chinese language support.", file=sys.stderr)
+        return 1
+
+    # Build a stale answer table once here rather than in every worker
+    load_table(args.csv)
+
+    start = time.perf_counter()
+    tier_counts = {}
+    failures = run_batch(paths, workers=args.workers, csv_path=args.csv, backend_name=args.ocr_backend,
+                         use_templates=args.templates, cache_db=args.cache_db,
+                         use_grid=args.grid, ocr_profile=args.ocr_profile, stitch=args.stitch,
+                         use_cascade=args.cascade, tier_counts=tier_counts)
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} screenshots in {elapsed:.2f}s, {failures} failed", file=sys.stderr)
+    read = sum(tier_counts.values())
+    if read:
+        rates = ", ".join(f"{tier} {tier_counts.get(tier, 0) / read:.0%}" for tier in TIERS)
+        print(f"OCR cascade over {read} blocks: {rates}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy
+from PIL import Image
+
+import ocr_backend
+from instrument import get_tracer, percentile
+import pipeline
+from localize import TagBoxLocator
+from ocr_cache import OCRCache
+from ocr_cascade import OCRCascade
+from ocr_profile import PROFILE_NAMES, LanguageLock
+from tags import arknights_tags_by_category
+from template_ocr import TemplateRecognizer, font_covers, load_font, render_text
+
+LANGS = ("ENG", "CHI")
+DEFAULT_SCALES = (0.75, 1.0, 1.5)
+DEFAULT_NOISE = (0.0, 6.0, 12.0)
+DEFAULT_JPEG_QUALITY = (None, 85, 60)
+LABELS_FILE = "labels.json"
+BOX_SIZE = (260, 70)
+BOX_GAP = (30, 25)
+
+
+def tag_labels(lang):
+    # (tag, text shown in game) pairs available for a client language
+    labels = []
+    for tags in arknights_tags_by_category.values():
+        for eng_tag, chi_tag in tags.items():
+            if lang == "ENG":
+                labels.append((eng_tag, eng_tag.upper()))
+            elif chi_tag:
+                labels.append((eng_tag, chi_tag))
+    return labels
+
+
+def render_panel(texts, lang, rng, scale=1.0, noise=6.0, jpeg_quality=None):
+    # Dark panel, 3 + 2 bordered tag boxes with light text and a loose margin
+    box_w, box_h = int(BOX_SIZE[0] * scale), int(BOX_SIZE[1] * scale)
+    gap_x, gap_y = int(BOX_GAP[0] * scale), int(BOX_GAP[1] * scale)
+    margin_x, margin_y = (int(m * scale) for m in rng.integers(10, 70, 2))
+    width = margin_x * 2 + box_w * 3 + gap_x * 2
+    height = margin_y * 2 + box_h * 2 + gap_y
+    frame = numpy.full((height, width), rng.integers(25, 50), dtype=numpy.float32)
+    font = load_font(lang, max(8, int(26 * scale)))
+    border = max(1, int(2 * scale))
+
+    positions = [(row, col) for row, count in enumerate((3, 2)) for col in range(count)]
+    for text, (row, col) in zip(texts, positions):
+        x = margin_x + col * (box_w + gap_x)
+        y = margin_y + row * (box_h + gap_y)
+        cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), 70, -1)
+        cv2.rectangle(frame, (x, y), (x + box_w, y + box_h), 190, border)
+        glyphs = render_text(text, font).astype(numpy.float32) * 0.85
+        glyphs = glyphs[:box_h - 2 * border, :box_w - 2 * border]
+        gh, gw = glyphs.shape
+        gx, gy = x + (box_w - gw) // 2, y + (box_h - gh) // 2
+        frame[gy:gy + gh, gx:gx + gw] = numpy.maximum(frame[gy:gy + gh, gx:gx + gw], glyphs)
+
+    if noise:
+        frame += rng.normal(0, noise, frame.shape)
+    image = Image.fromarray(numpy.clip(frame, 0, 255).astype(numpy.uint8)).convert('RGB')
+    if jpeg_quality:
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=jpeg_quality)
+        buffer.seek(0)
+        image = Image.open(buffer).convert('RGB')
+    return image
+
+
+def synthetic_cases(count, seed=0, langs=LANGS, scales=DEFAULT_SCALES, noise_levels=DEFAULT_NOISE,
+                    jpeg_qualities=DEFAULT_JPEG_QUALITY):
+    rng = numpy.random.default_rng(seed)
+    usable = [lang for lang in langs if font_covers(load_font(lang, 26), lang)]
+    for lang in set(langs) - set(usable):
+        print(f"No font with {lang} glyphs found, skipping {lang} panels", file=sys.stderr)
+    if not usable:
+        return
+    for index in range(count):
+        lang = usable[index % len(usable)]
+        labels = tag_labels(lang)
+        picks = rng.choice(len(labels), 5, replace=False)
+        scale = float(rng.choice(scales))
+        noise = float(rng.choice(noise_levels))
+        quality = jpeg_qualities[rng.integers(len(jpeg_qualities))]
+        image = render_panel([labels[i][1] for i in picks], lang, rng, scale, noise, quality)
+        yield {
+            'name': f"synthetic-{index:04d}-{lang}-x{scale}-n{noise:g}-q{quality or 'raw'}",
+            'image': image,
+            'tags': [labels[i][0] for i in picks]
+        }
+
+
+def labelled_cases(folder):
+    # labels.json maps screenshot file names to their expected EN tags
+    with open(os.path.join(folder, LABELS_FILE), encoding='utf-8') as f:
+        labels = json.load(f)
+    for name, expected in sorted(labels.items()):
+        with Image.open(os.path.join(folder, name)) as image:
+            yield {'name': name, 'image': image.convert('RGB'), 'tags': expected}
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(cases, warmup=2, trace_memory=False, **recognize_kwargs):
+    stage_samples = {}
+    true_positive = false_positive = false_negative = 0
+    failures = []
+    count = 0
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for case in cases:
+        start = time.perf_counter()
+        result = pipeline.recognize_image(case['image'], **recognize_kwargs)
+        total_ms = (time.perf_counter() - start) * 1000
+        count += 1
+        if count <= warmup:
+            continue
+
+        for stage, ms in result['timings'].items():
+            stage_samples.setdefault(stage, []).append(ms)
+        stage_samples.setdefault('total', []).append(total_ms)
+
+        expected, found = set(case['tags']), set(result['tags'])
+        true_positive += len(expected & found)
+        false_positive += len(found - expected)
+        false_negative += len(expected - found)
+        if expected != found:
+            failures.append({'name': case['name'], 'missing': sorted(expected - found), 'extra': sorted(found - expected)})
+    elapsed = time.perf_counter() - started
+    traced_peak_mb = None
+    if trace_memory:
+        traced_peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    measured = max(0, count - warmup)
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    return {
+        'cases': measured,
+        'stages': {stage: {'p50_ms': percentile(samples, 50), 'p95_ms': percentile(samples, 95)}
+                   for stage, samples in stage_samples.items()},
+        'throughput_per_s': round(measured / sum(stage_samples['total']) * 1000, 3) if measured else 0.0,
+        'wall_s': round(elapsed, 3),
+        'memory': {'peak_rss_mb': peak_rss_mb(), 'traced_peak_mb': traced_peak_mb},
+        'accuracy': {'precision': round(precision, 4), 'recall': round(recall, 4),
+                     'exact_rolls': measured - len(failures)},
+        'failures': failures[:50]
+    }
+
+
+def compare(report, baseline):
+    # Positive latency deltas and negative accuracy deltas are regressions
+    deltas = {'stages': {}}
+    for stage, stats in report.get('stages', {}).items():
+        base = baseline.get('stages', {}).get(stage)
+        if not base:
+            continue
+        deltas['stages'][stage] = {key: round(stats[key] - base[key], 3)
+                                   for key in ('p50_ms', 'p95_ms') if stats[key] is not None and base.get(key) is not None}
+    for key in ('precision', 'recall'):
+        if key in baseline.get('accuracy', {}) and 'accuracy' in report:
+            deltas[key] = round(report['accuracy'][key] - baseline['accuracy'][key], 4)
+    if baseline.get('throughput_per_s') and 'throughput_per_s' in report:
+        deltas['throughput_per_s'] = round(report['throughput_per_s'] - baseline['throughput_per_s'], 3)
+    return deltas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmark.py", description="Headless latency and accuracy benchmark for the recognition pipeline.")
+    parser.add_argument('--synthetic', type=int, default=100, help="number of synthetic panels (0 to disable)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--langs', nargs='+', choices=LANGS, default=list(LANGS))
+    parser.add_argument('--labelled', default=None, help=f"folder of real screenshots with a {LABELS_FILE}")
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--ocr-backend', choices=ocr_backend.BACKEND_NAMES, default="auto")
+    parser.add_argument('--templates', action='store_true', help="enable the template recognizer")
+    parser.add_argument('--grid', action='store_true', help="use the fixed grid instead of tag-box detection")
+    parser.add_argument('--cache', action='store_true', help="enable the OCR result cache")
+    parser.add_argument('--stitch', action='store_true', help="OCR each panel's blocks in one stitched call")
+    parser.add_argument('--cascade', action='store_true', help="try a cheap native-resolution read of each block before the full preprocessing")
+    parser.add_argument('--trace-memory', action='store_true', help="also report the tracemalloc peak (slows every stage)")
+    parser.add_argument('--ocr-profile', choices=PROFILE_NAMES, default="auto", help="OCR language profile")
+    parser.add_argument('--compare-profiles', action='store_true', help="rerun the same cases under every OCR profile")
+    parser.add_argument('--trace', default=None, help="write a Chrome trace of every span to this file")
+    parser.add_argument('--baseline', default=None, help="saved report to compare against")
+    parser.add_argument('--save', default=None, help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    ocr_backend.set_backend_name(args.ocr_backend)
+    get_tracer().enabled = bool(args.trace)
+    recognize_kwargs = {
+        'recognizer': TemplateRecognizer() if args.templates else None,
+        'locator': None if args.grid else TagBoxLocator(),
+        'cache': OCRCache() if args.cache else None,
+        'stitch': args.stitch,
+        'cascade': OCRCascade() if args.cascade else None
+    }
+
+    def cases():
+        if args.synthetic:
+            yield from synthetic_cases(args.synthetic, seed=args.seed, langs=args.langs)
+        if args.labelled:
+            yield from labelled_cases(args.labelled)
+
+    if args.compare_profiles:
+        # Same panels for every profile; a fresh lock and cache per run
+        case_list = list(cases())
+        profiles = {}
+        for name in PROFILE_NAMES:
+            if args.cache:
+                recognize_kwargs['cache'] = OCRCache()
+            if args.cascade:
+                recognize_kwargs['cascade'] = OCRCascade()
+            run = run_benchmark(case_list, warmup=args.warmup, language=LanguageLock(name), **recognize_kwargs)
+            profiles[name] = {'ocr': run['stages'].get('ocr'), 'total': run['stages'].get('total'),
+                              'throughput_per_s': run['throughput_per_s'], 'accuracy': run['accuracy']}
+            if args.cascade:
+                profiles[name]['cascade'] = recognize_kwargs['cascade'].stats()
+        report = {'profiles': profiles}
+    else:
+        report = run_benchmark(cases(), warmup=args.warmup, trace_memory=args.trace_memory,
+                               language=LanguageLock(args.ocr_profile), **recognize_kwargs)
+        if args.cascade:
+            report['cascade'] = recognize_kwargs['cascade'].stats()
+    report['config'] = {
+        'synthetic': args.synthetic, 'seed': args.seed, 'langs': args.langs, 'labelled': args.labelled,
+        'ocr_backend': ocr_backend.get_backend().name, 'templates': args.templates, 'grid': args.grid,
+        'cache': args.cache, 'stitch': args.stitch, 'cascade': args.cascade, 'ocr_profile': args.ocr_profile, 'python': platform.python_version(), 'machine': platform.machine()
+    }
+    if args.trace:
+        report['spans'] = get_tracer().histograms()
+        get_tracer().export(args.trace)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['comparison'] = compare(report, json.load(f))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+# Layout helpers shared by the binary caches (operator index, answer table,
+# avatar atlas): every section starts on an 8-byte boundary so the arrays in
+# it can be viewed in place with numpy.frombuffer or numpy.memmap.
+ALIGNMENT = 8
+
+
+def aligned(size):
+    return size + (-size % ALIGNMENT)
+
+
+def padded(data):
+    return data.ljust(aligned(len(data)), b"\0")
+
+
+def write_atomic(path, data):
+    # Several batch or server processes may rebuild the same cache at once:
+    # each writes a private temp file next to the target and swaps it in whole
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                     dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
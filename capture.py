@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy
+from PIL import Image
+
+from instrument import percentile
+
+CAPTURE_NAMES = ("auto", "mss", "pil")
+MSS_PREFIX = "mss:"
+REPLAY_PREFIX = "replay:"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+LATENCY_HISTORY = 256
+DEFAULT_BENCH_GRABS = 30
+
+
+class CaptureSource:
+    # grab(bbox) -> RGB array of just the (x1, y1, x2, y2) region, or the
+    # primary screen when bbox is None. The array is a reusable buffer that
+    # the next grab overwrites; grab_image() returns a copy that stays put.
+    name = "capture"
+
+    def __init__(self):
+        self.grabs = 0
+        self._buffer = None
+        self._latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def _target(self, width, height):
+        # Reallocated only when the region size changes, so a watched area
+        # is captured into the same memory every poll
+        if self._buffer is None or self._buffer.shape[:2] != (height, width):
+            self._buffer = numpy.empty((height, width, 3), dtype=numpy.uint8)
+        return self._buffer
+
+    def _grab(self, bbox):
+        raise NotImplementedError
+
+    def grab(self, bbox=None):
+        start = time.perf_counter()
+        frame = self._grab(bbox)
+        self._latencies.append((time.perf_counter() - start) * 1000)
+        self.grabs += 1
+        return frame
+
+    def grab_image(self, bbox=None):
+        # PIL copies RGB arrays, so the image owns its pixels
+        return Image.fromarray(self.grab(bbox))
+
+    def stats(self):
+        samples = list(self._latencies)
+        return {
+            'backend': self.name,
+            'grabs': self.grabs,
+            'last_ms': round(samples[-1], 3) if samples else None,
+            'p50_ms': percentile(samples, 50),
+            'p95_ms': percentile(samples, 95)
+        }
+
+    def close(self):
+        pass
+
+
+class PILCapture(CaptureSource):
+    # The original ImageGrab path. PIL allocates a new image per grab; it is
+    # copied into the shared buffer so callers see the same interface.
+    name = "pil"
+
+    def _grab(self, bbox):
+        from PIL import ImageGrab
+        image = ImageGrab.grab(bbox=bbox)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        width, height = image.size
+        target = self._target(width, height)
+        target[...] = numpy.asarray(image)
+        return target
+
+
+class MSSCapture(CaptureSource):
+    # mss reads the region straight from the display server (XShm on X11,
+    # BitBlt on Windows) into one reused BGRA buffer, converted in place.
+    # Handles are bound to the thread that made them; grab from that thread.
+    name = "mss"
+
+    def __init__(self, monitor=None):
+        import mss
+        super().__init__()
+        self._mss = mss.mss()
+        self._primary = self._pick_monitor(self._mss.monitors, monitor)
+
+    @staticmethod
+    def _pick_monitor(monitors, index=None):
+        # monitors[0] spans every screen and the rest are in the order the OS
+        # lists them, which need not put the primary first. ImageGrab.grab()
+        # covers the primary, the screen whose origin is (0, 0).
+        if index is not None:
+            if not 1 <= index < len(monitors):
+                raise ValueError(f"No monitor {index}, mss sees {len(monitors) - 1}")
+            return monitors[index]
+        return next((monitor for monitor in monitors[1:] if (monitor['left'], monitor['top']) == (0, 0)),
+                    monitors[1] if len(monitors) > 1 else monitors[0])
+
+    def _grab(self, bbox):
+        if bbox is None:
+            region = self._primary
+        else:
+            x1, y1, x2, y2 = bbox
+            region = {'left': x1, 'top': y1, 'width': x2 - x1, 'height': y2 - y1}
+        shot = self._mss.grab(region)
+        bgra = numpy.frombuffer(shot.raw, dtype=numpy.uint8).reshape(shot.height, shot.width, 4)
+        return cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=self._target(shot.width, shot.height))
+
+    def close(self):
+        self._mss.close()
+
+
+def replay_paths(path):
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.lower().endswith(IMAGE_EXTENSIONS))
+    return [path] if os.path.isfile(path) else []
+
+
+class ReplayCapture(CaptureSource):
+    # Recorded screenshots standing in for the screen, so the app and the
+    # benchmarks run with no display. Without fps every grab shows the next
+    # frame; with fps the frames play back in real time like a live screen.
+    name = "replay"
+
+    def __init__(self, path, fps=None, loop=True):
+        super().__init__()
+        self.paths = replay_paths(path)
+        if not self.paths:
+            raise OSError(f"No frames to replay in {path}")
+        self.fps = fps
+        self.loop = loop
+        self._next = 0
+        self._started = None
+        self._frame = None
+        self._frame_index = None
+
+    def _current(self):
+        if self.fps:
+            now = time.perf_counter()
+            if self._started is None:
+                self._started = now
+            index = int((now - self._started) * self.fps)
+        else:
+            index = self._next
+            self._next += 1
+        index = index % len(self.paths) if self.loop else min(index, len(self.paths) - 1)
+        if index != self._frame_index:
+            frame = cv2.imread(self.paths[index], cv2.IMREAD_COLOR)
+            if frame is None:
+                raise OSError(f"Cannot read frame {self.paths[index]}")
+            self._frame, self._frame_index = frame, index
+        return self._frame
+
+    def _grab(self, bbox):
+        frame = self._current()
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = bbox or (0, 0, width, height)
+        x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+        y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Region {bbox} is outside the {width}x{height} replay frame")
+        return cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2RGB, dst=self._target(x2 - x1, y2 - y1))
+
+
+def open_capture(spec="auto", fps=None):
+    # spec: auto (mss if installed, else pil), mss, mss:<monitor number>, pil,
+    # or replay:<file or folder>; a bare existing path also replays
+    if spec.startswith(REPLAY_PREFIX):
+        return ReplayCapture(spec[len(REPLAY_PREFIX):], fps=fps)
+    if spec.startswith(MSS_PREFIX):
+        try:
+            monitor = int(spec[len(MSS_PREFIX):])
+        except ValueError:
+            raise ValueError(f"Expected a monitor number in {spec!r}, e.g. {MSS_PREFIX}2") from None
+        return MSSCapture(monitor)
+    if spec not in CAPTURE_NAMES:
+        if os.path.exists(spec):
+            return ReplayCapture(spec, fps=fps)
+        raise ValueError(f"Unknown capture source {spec!r}, expected one of {', '.join(CAPTURE_NAMES)}, {MSS_PREFIX}<monitor> or {REPLAY_PREFIX}<path>")
+    if spec in ("auto", "mss"):
+        try:
+            return MSSCapture()
+        except ImportError:
+            if spec == "mss":
+                raise
+    return PILCapture()
+
+
+def benchmark_capture(spec, bbox=None, grabs=DEFAULT_BENCH_GRABS):
+    # Full-screen and region latency for one source, after one warm-up grab
+    capture = open_capture(spec)
+    try:
+        capture.grab(bbox)
+        report = {'backend': capture.name, 'spec': spec}
+        for label, region in (('full', None), ('region', bbox)):
+            if label == 'region' and bbox is None:
+                continue
+            samples = []
+            for _ in range(grabs):
+                start = time.perf_counter()
+                frame = capture.grab(region)
+                samples.append((time.perf_counter() - start) * 1000)
+            report[label] = {'size': [frame.shape[1], frame.shape[0]], 'p50_ms': percentile(samples, 50),
+                             'p95_ms': percentile(samples, 95), 'mean_ms': round(sum(samples) / len(samples), 3)}
+        return report
+    finally:
+        capture.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m capture", description="Measure screen capture latency for each capture backend.")
+    parser.add_argument('sources', nargs='*', default=["pil", "mss"], help=f"backends to time: {', '.join(CAPTURE_NAMES[1:])}, {MSS_PREFIX}<monitor> or {REPLAY_PREFIX}<path> (default: pil mss)")
+    parser.add_argument('--region', type=int, nargs=4, metavar=('X1', 'Y1', 'X2', 'Y2'), default=None, help="also time region-only grabs of this box")
+    parser.add_argument('-n', '--grabs', type=int, default=DEFAULT_BENCH_GRABS, help="grabs timed per source and region")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for spec in args.sources:
+        try:
+            report = benchmark_capture(spec, tuple(args.region) if args.region else None, args.grabs)
+        except Exception as e:
+            report = {'spec': spec, 'error': f"{type(e).__name__}: {e}"}
+            failures += 1
+        print(json.dumps(report))
+    return 1 if failures == len(args.sources) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,4 +22,17 @@ for key, value in replacing.items():
 with open("./data/operatordata_en.csv", "w", encoding="utf-8") as f:
     f.write(data)
 
-print("Replacement complete. New file saved as operatordata_en.csv")
\ No newline at end of file
+print("Replacement complete. New file saved as operatordata_en.csv")
+
+from operator_index import build_index, index_path_for
+
+build_index("./data/operatordata_en.csv")
+print(f"Operator index rebuilt as {index_path_for('./data/operatordata_en.csv')}")
+
+from avatar_atlas import build_atlas
+
+print(f"Avatar atlas rebuilt as {build_atlas()}")
+
+from answer_table import build_table
+
+print(f"Answer table rebuilt as {build_table('./data/operatordata_en.csv')}")
@@ -0,0 +1,39 @@
+import os
+import queue
+import threading
+
+from PIL import Image
+
+DEFAULT_DUMP_DIR = "./temp"
+
+
+class DebugDumper:
+    # Opt-in PNG dumps of intermediate frames, encoded on a background thread
+    # so the capture/OCR path never waits on disk.
+    def __init__(self, directory=DEFAULT_DUMP_DIR, max_pending=32):
+        self.directory = directory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="debug-dump", daemon=True)
+        self._thread.start()
+
+    def dump(self, image, filename):
+        try:
+            self._queue.put_nowait((image.copy(), filename))
+        except queue.Full:
+            pass
+
+    def flush(self):
+        self._queue.join()
+
+    def _run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while True:
+            image, filename = self._queue.get()
+            try:
+                if not isinstance(image, Image.Image):
+                    image = Image.fromarray(image)
+                image.save(os.path.join(self.directory, filename))
+            except Exception as e:
+                print(f"Debug dump of {filename} failed: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,206 @@
+import threading
+
+import cv2
+import numpy
+
+EXPECTED_BOXES = 5
+ROW_LAYOUT = (3, 2)
+MIN_BOX_AREA_RATIO = 0.01
+MAX_BOX_AREA_RATIO = 0.25
+MIN_BOX_ASPECT = 1.8
+MAX_BOX_ASPECT = 7.0
+MIN_RECTANGULARITY = 0.85
+SIZE_TOLERANCE = 0.12
+BORDER_EDGE_COVERAGE = 0.6
+BORDER_INSET_RATIO = 0.12
+# Tag boxes in a full-screen capture are a much smaller share of the frame
+SCREEN_MIN_BOX_AREA_RATIO = 0.0008
+SCREEN_MAX_BOX_AREA_RATIO = 0.03
+NEIGHBOR_X_RATIO = 1.4
+NEIGHBOR_Y_RATIO = 1.8
+PANEL_MARGIN_RATIO = 0.4
+
+
+def frame_edges(gray):
+    return cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 40, 120)
+
+
+def box_area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = box_area(a) + box_area(b) - inter
+    return inter / union if union else 0.0
+
+
+def similar_size(a, b):
+    wa, ha = a[2] - a[0], a[3] - a[1]
+    wb, hb = b[2] - b[0], b[3] - b[1]
+    return abs(wa - wb) <= SIZE_TOLERANCE * max(wa, wb) and abs(ha - hb) <= SIZE_TOLERANCE * max(ha, hb)
+
+
+def candidate_boxes(edges, min_area_ratio=MIN_BOX_AREA_RATIO, max_area_ratio=MAX_BOX_AREA_RATIO):
+    height, width = edges.shape
+    frame_area = width * height
+    closed = cv2.dilate(edges, numpy.ones((3, 3), numpy.uint8))
+    contours, _ = cv2.findContours(closed, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = w * h
+        if not min_area_ratio * frame_area <= area <= max_area_ratio * frame_area:
+            continue
+        if not MIN_BOX_ASPECT <= w / h <= MAX_BOX_ASPECT:
+            continue
+        if cv2.contourArea(contour) < MIN_RECTANGULARITY * area:
+            continue
+        boxes.append((x, y, x + w, y + h))
+    return boxes
+
+
+def suppress_duplicates(boxes):
+    # The inner and outer edge of one border both produce a rectangle; keep the outer
+    kept = []
+    for box in sorted(boxes, key=box_area, reverse=True):
+        if all(box_iou(box, other) < 0.5 for other in kept):
+            kept.append(box)
+    return kept
+
+
+def layout_boxes(boxes):
+    # Reading order: rows top to bottom, then left to right within a row
+    boxes = sorted(boxes, key=lambda b: (b[1] + b[3]) / 2)
+    median_height = numpy.median([b[3] - b[1] for b in boxes])
+    rows = []
+    for box in boxes:
+        center = (box[1] + box[3]) / 2
+        if rows and abs(center - rows[-1][-1][0]) < median_height / 2:
+            rows[-1].append((center, box))
+        else:
+            rows.append([(center, box)])
+    placed = []
+    for row_index, row in enumerate(rows):
+        for col_index, (_, box) in enumerate(sorted(row, key=lambda item: item[1][0])):
+            placed.append((row_index, col_index, box))
+    return placed
+
+
+def detect_tag_boxes(gray, edges=None):
+    edges = frame_edges(gray) if edges is None else edges
+    candidates = suppress_duplicates(candidate_boxes(edges))
+
+    # Tag boxes share one size; take the largest same-size group
+    best_group, best_score = [], (0, 0)
+    for seed in candidates:
+        group = [box for box in candidates if similar_size(seed, box)]
+        score = (len(group), box_area(seed))
+        if score > best_score:
+            best_group, best_score = group, score
+    return arrange_panel(best_group)
+
+
+def arrange_panel(boxes):
+    # -> the first five boxes as (row, col, box) if they form the 3 + 2 layout
+    if len(boxes) < EXPECTED_BOXES:
+        return None
+    placed = layout_boxes(boxes)[:EXPECTED_BOXES]
+    row_sizes = [sum(1 for row, _, _ in placed if row == r) for r in range(len(ROW_LAYOUT))]
+    if tuple(row_sizes) != ROW_LAYOUT:
+        return None
+    return placed
+
+
+def neighbors(a, b):
+    w, h = a[2] - a[0], a[3] - a[1]
+    return abs(a[0] - b[0]) <= NEIGHBOR_X_RATIO * w and abs(a[1] - b[1]) <= NEIGHBOR_Y_RATIO * h
+
+
+def find_tag_panels(gray):
+    # Every 3 + 2 tag panel in a full-screen capture, as (panel box, placed
+    # boxes relative to that panel), top to bottom then left to right.
+    # Same-size boxes are chained into clusters by proximity, one per panel.
+    height, width = gray.shape
+    candidates = suppress_duplicates(candidate_boxes(frame_edges(gray), SCREEN_MIN_BOX_AREA_RATIO,
+                                                     SCREEN_MAX_BOX_AREA_RATIO))
+    unassigned = sorted(candidates, key=lambda b: (b[1], b[0]))
+    panels = []
+    while unassigned:
+        cluster = [unassigned.pop(0)]
+        grown = True
+        while grown:
+            grown = False
+            for box in list(unassigned):
+                if any(similar_size(box, member) and neighbors(member, box) for member in cluster):
+                    cluster.append(box)
+                    unassigned.remove(box)
+                    grown = True
+        placed = arrange_panel(cluster) if len(cluster) == EXPECTED_BOXES else None
+        if not placed:
+            continue
+        x1 = min(box[0] for _, _, box in placed)
+        y1 = min(box[1] for _, _, box in placed)
+        x2 = max(box[2] for _, _, box in placed)
+        y2 = max(box[3] for _, _, box in placed)
+        margin = int((placed[0][2][3] - placed[0][2][1]) * PANEL_MARGIN_RATIO)
+        panel = (max(0, x1 - margin), max(0, y1 - margin), min(width, x2 + margin), min(height, y2 + margin))
+        relative = [(row, col, (box[0] - panel[0], box[1] - panel[1], box[2] - panel[0], box[3] - panel[1]))
+                    for row, col, box in placed]
+        panels.append((panel, relative))
+    order = {box: i for i, (_, _, box) in enumerate(layout_boxes([panel for panel, _ in panels]))} if panels else {}
+    return sorted(panels, key=lambda p: order[p[0]])
+
+
+def border_coverage(edges, box, band=2):
+    x1, y1, x2, y2 = box
+    height, width = edges.shape
+    if x1 < 0 or y1 < 0 or x2 > width or y2 > height:
+        return 0.0
+    top = edges[max(0, y1 - band):y1 + band + 1, x1:x2].any(axis=0).mean()
+    bottom = edges[max(0, y2 - band - 1):y2 + band, x1:x2].any(axis=0).mean()
+    left = edges[y1:y2, max(0, x1 - band):x1 + band + 1].any(axis=1).mean()
+    right = edges[y1:y2, max(0, x2 - band - 1):x2 + band].any(axis=1).mean()
+    return min(top, bottom, left, right)
+
+
+def inset_box(box):
+    x1, y1, x2, y2 = box
+    inset = max(2, int((y2 - y1) * BORDER_INSET_RATIO))
+    return (x1 + inset, y1 + inset, x2 - inset, y2 - inset)
+
+
+class TagBoxLocator:
+    # Finds the five tag rectangles from their borders and caches the geometry
+    # per selection size and screen resolution. Later scans only check that
+    # the cached borders are still there and re-detect when they are not.
+    def __init__(self):
+        self._geometry = {}
+        self._lock = threading.Lock()
+        self.detections = 0
+        self.cache_hits = 0
+
+    def locate(self, gray, screen_key=None):
+        # -> (placed boxes as (row, col, box), 'cached' | 'detected') or (None, 'grid')
+        key = (gray.shape[1], gray.shape[0], screen_key)
+        edges = frame_edges(gray)
+        with self._lock:
+            cached = self._geometry.get(key)
+        if cached and all(border_coverage(edges, box) >= BORDER_EDGE_COVERAGE for _, _, box in cached):
+            self.cache_hits += 1
+            return cached, "cached"
+
+        self.detections += 1
+        placed = detect_tag_boxes(gray, edges)
+        with self._lock:
+            if placed:
+                self._geometry[key] = placed
+            else:
+                self._geometry.pop(key, None)
+        return (placed, "detected") if placed else (None, "grid")
+
+    def clear(self):
+        with self._lock:
+            self._geometry.clear()
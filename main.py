@@ -1,75 +1,48 @@
+import time
+_import_start = time.perf_counter()
 import sys
-import re
 import os
+import threading
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QWidget, QPushButton, QLabel, QTextEdit, QListWidget,
-                             QSplitter, QMessageBox, QListWidgetItem,
-                             QAbstractItemView)
+                             QWidget, QPushButton, QLabel, QTextEdit,
+                             QSplitter, QMessageBox, QTabWidget)
 from PyQt5.QtCore import Qt, QRect, QPoint, pyqtSignal, QTimer, QSize
-from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor, QBrush, QFont
-import pytesseract
-from PIL import Image, ImageGrab, ImageEnhance, ImageDraw
-import cv2
-import numpy
-import csv
-import json
-from collections import defaultdict
-from itertools import combinations
-from langdetect import detect
-
-arknights_tags_by_category = {
-    "Class": {
-        "Guard": "近卫干员",
-        "Sniper": "狙击干员",
-        "Defender": "重装干员",
-        "Medic": "医疗干员",
-        "Supporter": "辅助干员",
-        "Caster": "术师干员",
-        "Specialist": "特种干员",
-        "Vanguard": "先锋干员"
-    },
-    "Position": {
-        "Melee": "近战位",
-        "Ranged": "远程位"
-    },
-    "Qualification": {
-        "Starter": "新手",
-        "Senior Operator": "资深干员",
-        "Top Operator": "高级资深干员"
-    },
-    "Affix": {
-        "Crowd Control": "控场",
-        "Nuker": "爆发",
-        "Healing": "治疗",
-        "Support": "支援",
-        "DP-Recovery": "费用回复",
-        "DPS": "输出",
-        "Survival": "生存",
-        "AoE": "群攻",
-        "Defense": "防护",
-        "Slow": "减速",
-        "Debuff": "削弱",
-        "Fast-Redeploy": "快速复活",
-        "Shift": "位移",
-        "Summon": "召唤",
-        "Robot": "",
-        "Elemental": "",
-    }
-}
+from PyQt5.QtGui import QPixmap, QPainter, QPen, QColor, QBrush, QFont, QImage
+from PIL import Image, ImageDraw
+from debug_dump import DebugDumper
+from instrument import format_breakdown, get_tracer
+from results_view import AvatarPixmapCache, OperatorGroupView, SlotResultView
+from scan_worker import ScanController, SlotScanTask
+
+# OpenCV, numpy, Tesseract and the recognizers are imported by the engine
+# loader thread once the window is up, so they never delay the first paint.
+startup_timings = {'imports': time.perf_counter() - _import_start}
+
+def pil_to_qimage(image):
+    # Raw pixel copy into an owning QImage, no PNG round trip through ./temp
+    if image.mode == 'L':
+        fmt, channels = QImage.Format_Grayscale8, 1
+    elif image.mode == 'RGBA':
+        fmt, channels = QImage.Format_RGBA8888, 4
+    else:
+        image = image.convert('RGB')
+        fmt, channels = QImage.Format_RGB888, 3
+    data = image.tobytes()
+    width, height = image.size
+    return QImage(data, width, height, width * channels, fmt).copy()
+
 
 class ScreenSelector(QWidget):
     selection_made = pyqtSignal(QRect)
 
-    def __init__(self):
+    def __init__(self, screenshot):
         super().__init__()
-        os.makedirs("./temp", exist_ok=True)
-        self.screenshot = ImageGrab.grab()
+        self.screenshot = screenshot
         screen_geometry = QApplication.primaryScreen().geometry()
         self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         self.setGeometry(screen_geometry)
         self.setCursor(Qt.CrossCursor)
-        self.screenshot.save("./temp/temp_screenshot.png")
-        self.background_pixmap = QPixmap("./temp/temp_screenshot.png")
+        self.background_pixmap = QPixmap.fromImage(pil_to_qimage(self.screenshot))
         self.start_point = QPoint()
         self.end_point = QPoint()
         self.selecting = False
@@ -112,21 +85,54 @@ class ScreenSelector(QWidget):
         if event.key() == Qt.Key_Escape:
             self.close()
 
-    def closeEvent(self, event):
-        if os.path.exists("./temp/temp_screenshot.png"):
-            os.remove("./temp/temp_screenshot.png")
-        super().closeEvent(event)
-
 class ArknightsOCRApp(QMainWindow):
-    def __init__(self, compact_mode: bool = False):
+    engine_loaded = pyqtSignal(bool, str)
+
+    def __init__(self, compact_mode: bool = False, debug_dump: bool = False, use_templates: bool = False,
+                 persist_cache: bool = False, use_grid: bool = False, ocr_profile: str = "auto",
+                 profile_startup: bool = False, stitch: bool = False, use_cascade: bool = False,
+                 capture_spec: str = "auto"):
         super().__init__()
         self.selected_area = None
+        self.grab_timings = {}
+        self.debug_dumper = DebugDumper() if debug_dump else None
+        self.engine_options = (use_templates, persist_cache, use_grid, ocr_profile)
+        self.engine_ready = threading.Event()
+        self.engine_warnings = []
+        self.profile_startup = profile_startup
+        self.stitch = stitch
+        self.use_cascade = use_cascade
+        self.capture_spec = capture_spec
+        self.capture = None
+        self.template_recognizer = None
+        self.ocr_cache = None
+        self.ocr_cascade = None
+        self.locator = None
+        self.language_lock = None
+        self.watch_gate = None
+        self.watch_scheduler = None
+        self.avatar_atlas = None
+        self.avatar_pixmaps = None
+        self.slot_views = []
         self.setup_dark_theme()
         if compact_mode :
             self.init_compact_ui()
         else:
             self.init_ui()
 
+        self.engine_loaded.connect(self.on_engine_loaded)
+        self.scan_controller = ScanController(self)
+        self.scan_controller.signals.block_done.connect(self.on_block_done)
+        self.scan_controller.signals.slot_done.connect(self.on_slot_done)
+        self.scan_controller.signals.finished.connect(self.on_scan_finished)
+        self.scan_controller.signals.failed.connect(self.on_scan_failed)
+        self.scan_blocks = {}
+        self.scan_interactive = True
+        self.watch_busy = 0.0
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.timeout.connect(self.poll_watch)
+
     def setup_dark_theme(self):
         self.setStyleSheet("""
             QMainWindow { background-color: #2b2b2b; color: white; }
@@ -137,9 +143,10 @@ class ArknightsOCRApp(QMainWindow):
             QPushButton:disabled { background-color: #333; color: #666; border-color: #444; }
             
             QTextEdit { background-color: #1e1e1e; border: 2px solid #555; color: #00ff00; font-family: Consolas, monospace; }
-            QListWidget { background-color: #1e1e1e; border: 2px solid #555; color: white; }
-            QListWidget::item { margin: 10px; border-radius: 4px; }
-            QListWidget::item:selected { background-color: #555; }
+            QListView { background-color: #1e1e1e; border: 2px solid #555; color: white; }
+            QTabWidget::pane { border: none; }
+            QTabBar::tab { background-color: #404040; border: 1px solid #555; padding: 6px 12px; color: #ccc; }
+            QTabBar::tab:selected { background-color: #555; color: white; }
             
             QLabel { color: #ccc; font-weight: bold; margin: 2px; }
             QScrollArea { background-color: #1e1e1e; border: 2px solid #555; }
@@ -204,6 +211,17 @@ class ArknightsOCRApp(QMainWindow):
         self.run_btn.clicked.connect(self.run_ocr_and_filter)
         self.run_btn.setEnabled(False)
         button_layout.addWidget(self.run_btn)
+
+        self.watch_btn = QPushButton("👁 Watch")
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.toggled.connect(self.toggle_watch)
+        self.watch_btn.setEnabled(False)
+        button_layout.addWidget(self.watch_btn)
+
+        self.slots_btn = QPushButton("🖥 Scan All Slots")
+        self.slots_btn.clicked.connect(self.scan_all_slots)
+        self.slots_btn.setEnabled(False)
+        button_layout.addWidget(self.slots_btn)
         main_layout.addLayout(button_layout)
 
         self.status_label = QLabel("Select an area on screen to begin OCR analysis (Supports EN/CN)")
@@ -239,10 +257,7 @@ class ArknightsOCRApp(QMainWindow):
         right_widget = QWidget()
         right_layout = QVBoxLayout(right_widget)
         right_layout.addWidget(QLabel("⭐ Matching Operators:"))
-        self.operators_list = QListWidget()
-        self.operators_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
-        self.operators_list.verticalScrollBar().setSingleStep(15)
-        right_layout.addWidget(self.operators_list)
+        right_layout.addWidget(self.init_result_tabs())
 
         splitter.addWidget(left_widget)
         splitter.addWidget(right_widget)
@@ -268,6 +283,17 @@ class ArknightsOCRApp(QMainWindow):
         self.run_btn.setEnabled(False)
         main_layout.addWidget(self.run_btn)
 
+        self.watch_btn = QPushButton("👁 Watch")
+        self.watch_btn.setCheckable(True)
+        self.watch_btn.toggled.connect(self.toggle_watch)
+        self.watch_btn.setEnabled(False)
+        main_layout.addWidget(self.watch_btn)
+
+        self.slots_btn = QPushButton("🖥 Scan All Slots")
+        self.slots_btn.clicked.connect(self.scan_all_slots)
+        self.slots_btn.setEnabled(False)
+        main_layout.addWidget(self.slots_btn)
+
         # --- Hidden Components (still initialized, but invisible) ---
         self.status_label = QLabel("Hidden in compact mode")
         self.status_label.setVisible(False)
@@ -286,293 +312,398 @@ class ArknightsOCRApp(QMainWindow):
         main_layout.addWidget(self.detected_tags)
 
         main_layout.addWidget(QLabel("⭐ Matching Operators:"))
-        self.operators_list = QListWidget()
-        self.operators_list.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
-        self.operators_list.verticalScrollBar().setSingleStep(15)
-        main_layout.addWidget(self.operators_list)
+        main_layout.addWidget(self.init_result_tabs())
+
+    def init_result_tabs(self):
+        # The selected area keeps the first tab; a full-screen scan adds one tab per slot
+        self.operators_list = OperatorGroupView()
+        self.result_tabs = QTabWidget()
+        self.result_tabs.addTab(self.operators_list, "Selection")
+        return self.result_tabs
+
+    def slot_view(self, index):
+        while len(self.slot_views) <= index:
+            view = SlotResultView()
+            if self.avatar_pixmaps is not None:
+                view.set_avatars(self.avatar_pixmaps)
+            self.slot_views.append(view)
+            self.result_tabs.addTab(view, f"Slot {len(self.slot_views)}")
+        return self.slot_views[index]
 
     def select_screen_area(self):
+        self.watch_btn.setChecked(False)
+        self.scan_controller.cancel_all()
         self.hide()
         QTimer.singleShot(200, self.show_screen_selector)
 
+    def capture_source(self):
+        # Opened on first use from the GUI thread, which keeps every grab (mss
+        # handles are per thread) and the OpenCV import off the startup path
+        if self.capture is None:
+            from capture import open_capture
+            self.capture = open_capture(self.capture_spec)
+        return self.capture
+
     def show_screen_selector(self):
-        self.screen_selector = ScreenSelector()
+        self.screen_selector = ScreenSelector(self.capture_source().grab_image())
         self.screen_selector.selection_made.connect(self.on_area_selected)
         self.screen_selector.show()
 
     def on_area_selected(self, rect):
         self.selected_area = rect
         self.show()
-        self.run_btn.setEnabled(True)
-        self.status_label.setText(f"📐 Area selected: {rect.width()}×{rect.height()} pixels at ({rect.x()}, {rect.y()})")
-        screenshot = ImageGrab.grab(bbox=(
-            rect.x(), rect.y(),
-            rect.x() + rect.width(),
-            rect.y() + rect.height()
-        ))
-        screenshot.save("./temp/preview.png")
-
-    def preprocess_image_for_ocr(self, image):
-        if image.mode != 'L':
-            image = image.convert('L')
-        width, height = image.size
-        image = image.resize((width * 2, height * 2), Image.LANCZOS)
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(1.5)
-        return image
-    
-    def auto_crop_image_adaptive(self, image_pillow):
-        try:
-            img_np_rgb = numpy.array(image_pillow)
-            img_np_bgr = cv2.cvtColor(img_np_rgb, cv2.COLOR_RGB2BGR)
-            gray = cv2.cvtColor(img_np_bgr, cv2.COLOR_BGR2GRAY)
-            thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                x, y, w, h = cv2.boundingRect(largest_contour)
-                padding = -10
-                x = max(0, x - padding)
-                y = max(0, y - padding)
-                w = min(img_np_bgr.shape[1] - x, w + 2 * padding)
-                h = min(img_np_bgr.shape[0] - y, h + 2 * padding)
-                cropped_img_np = img_np_bgr[y:y+h, x:x+w]
-                cropped_img_rgb = cv2.cvtColor(cropped_img_np, cv2.COLOR_BGR2RGB)
-                cropped_pillow_image = Image.fromarray(cropped_img_rgb)
-                return cropped_pillow_image
-            return image_pillow
-        except Exception as e:
-            print(f"Auto-crop failed: {e}")
-            return image_pillow
-        
-    def detect_language_and_text(self, image):
-        try:
-            text = pytesseract.image_to_string(image, config="--psm 6 -l chi_sim+eng").strip()
-            if not text:
-                return "ENG", ""
-            if re.search(r'[\u4e00-\u9fff]', text):
-                return "CHI", text
-            return "ENG", text
-        except Exception:
-            return "ENG", ""
+        self.run_btn.setEnabled(self.engine_ready.is_set())
+        self.watch_btn.setEnabled(self.engine_ready.is_set())
+        self.status_label.setText(f"📐 Area selected: {rect.width()}×{rect.height()} pixels at ({rect.x()}, {rect.y()})"
+                                  + ("" if self.engine_ready.is_set() else " — OCR engine still loading..."))
+        if self.debug_dumper:
+            # Cut from the selector's capture rather than grabbing the screen again
+            self.debug_dumper.dump(self.screen_selector.screenshot.crop(self.selected_bbox()), "preview.png")
+
+    def selected_bbox(self):
+        area = self.selected_area
+        return (area.x(), area.y(), area.x() + area.width(), area.y() + area.height())
+
+    def grab_frame(self, bbox=None):
+        # Only the region is captured, into the capture source's reusable
+        # buffer; the array is overwritten by the next grab
+        self.grab_timings = {}
+        with get_tracer().span('grab', self.grab_timings):
+            return self.capture_source().grab(bbox)
+
+    def grab_selected_area(self):
+        return Image.fromarray(self.grab_frame(self.selected_bbox()))
+
+    def toggle_watch(self, enabled):
+        if enabled and self.selected_area:
+            self.watch_gate.reset()
+            self.status_label.setText("👁 Watching selected area for new tags...")
+            self.watch_timer.start(0)
+        else:
+            self.watch_timer.stop()
+            if self.selected_area:
+                self.status_label.setText("⏸ Watch stopped")
+
+    def poll_watch(self):
+        # Grab and diff are cheap; the full scan only runs once the panel has
+        # changed and settled. The next poll is spaced to respect the CPU budget.
+        if not self.watch_btn.isChecked() or not self.selected_area:
+            return
+        start = time.perf_counter()
+        frame = self.grab_frame(self.selected_bbox())
+        if self.watch_gate.update(frame):
+            # Only frames worth scanning are copied out of the capture buffer
+            self.analyze_screenshot(Image.fromarray(frame), interactive=False)
+        # Scan time lands in watch_busy when the worker finishes it
+        self.watch_scheduler.record(time.perf_counter() - start + self.watch_busy)
+        self.watch_busy = 0.0
+        if self.watch_btn.isChecked():
+            self.watch_timer.start(self.watch_scheduler.next_interval_ms())
+
+    def scan_all_slots(self):
+        # One capture of the whole screen; every slot's panel is found and scanned from it
+        self.watch_btn.setChecked(False)
+        self.scan_controller.cancel_all()
+        self.hide()
+        QTimer.singleShot(200, self.grab_all_slots)
+
+    def grab_all_slots(self):
+        screenshot = Image.fromarray(self.grab_frame())
+        self.show()
+        self.status_label.setText("🔄 Scanning every recruitment slot on screen...")
+        self.scan_interactive = True
+        self.scan_controller.submit(screenshot, self.scan_kwargs(), task_class=SlotScanTask,
+                                    context={'interactive': True, 'grab_timings': self.grab_timings})
 
     def run_ocr_and_filter(self):
         if not self.selected_area:
             return
+        self.status_label.setText("🔄 Running language-detection OCR analysis...")
+        self.analyze_screenshot(self.grab_selected_area())
+
+    def start_engine(self):
+        self.status_label.setText("⏳ Loading OCR engine in the background...")
+        threading.Thread(target=self.load_engine, name="engine-loader", daemon=True).start()
+
+    def load_engine(self):
+        # Runs off the GUI thread: heavy imports, recognizer setup, Tesseract
+        # discovery and one throwaway OCR so the first real scan starts warm.
+        # The persistent cache and the portraits are optional and fall back
+        # quietly; anything else that fails is reported with its cause.
+        tracer = get_tracer()
+        use_templates, persist_cache, use_grid, ocr_profile = self.engine_options
         try:
-            self.status_label.setText("🔄 Running language-detection OCR analysis...")
-            QApplication.processEvents()
-
-            screenshot = ImageGrab.grab(bbox=(
-                self.selected_area.x(), self.selected_area.y(),
-                self.selected_area.x() + self.selected_area.width(),
-                self.selected_area.y() + self.selected_area.height()
-            ))
+            with tracer.span('engine imports', startup_timings):
+                import pipeline
+                from localize import TagBoxLocator
+                from ocr_backend import get_backend, warm_up_ocr
+                from ocr_cache import DEFAULT_DB_PATH, OCRCache
+                from ocr_cascade import OCRCascade
+                from matcher import get_matcher
+                from ocr_profile import LanguageLock
+                from template_ocr import get_recognizer
+                from watch import FrameDiffGate, PollScheduler
+            with tracer.span('engine setup', startup_timings):
+                self.template_recognizer = get_recognizer() if use_templates else None
+                try:
+                    self.ocr_cache = OCRCache(db_path=DEFAULT_DB_PATH if persist_cache else None)
+                except Exception as e:
+                    self.engine_warnings.append(f"persistent OCR cache unavailable ({e}), using memory only")
+                    self.ocr_cache = OCRCache()
+                self.ocr_cascade = OCRCascade() if self.use_cascade else None
+                self.locator = None if use_grid else TagBoxLocator()
+                self.language_lock = LanguageLock(ocr_profile)
+                # A roll can change while the panel is off screen or mid-animation,
+                # so any motion that settles earns a rescan
+                self.watch_gate = FrameDiffGate(rearm_on_motion=True)
+                self.watch_scheduler = PollScheduler()
+            with tracer.span('roster', startup_timings):
+                # Maps the answer table, rebuilding it here if the CSV changed
+                get_matcher()
+            with tracer.span('avatars', startup_timings):
+                try:
+                    from avatar_atlas import load_atlas
+                    self.avatar_atlas = load_atlas()
+                except Exception as e:
+                    self.engine_warnings.append(f"operator portraits unavailable ({e})")
+                    self.avatar_atlas = None
+        except Exception as e:
+            self.engine_loaded.emit(False, f"Could not load the OCR engine:\n\n{type(e).__name__}: {e}")
+            return
+        try:
+            with tracer.span('tesseract', startup_timings):
+                backend = get_backend(self.language_lock.profile())
+                backend.warm_up()
+            with tracer.span('warm-up OCR', startup_timings):
+                warm_up_ocr(self.language_lock.profile())
+        except Exception as e:
+            self.engine_loaded.emit(False, "Tesseract OCR not found! Please install it with Chinese language support."
+                                           f"\n\n{type(e).__name__}: {e}")
+            return
+        self.engine_ready.set()
+        self.engine_loaded.emit(True, backend.name)
+
+    def on_engine_loaded(self, ok, detail):
+        if not ok:
+            QMessageBox.critical(self, "Error", detail)
+            QApplication.exit(1)
+            return
+        if self.selected_area:
+            self.run_btn.setEnabled(True)
+            self.watch_btn.setEnabled(True)
+        self.slots_btn.setEnabled(True)
+        if self.avatar_atlas is not None:
+            self.avatar_pixmaps = AvatarPixmapCache(self.avatar_atlas)
+            self.operators_list.set_avatars(self.avatar_pixmaps)
+            for view in self.slot_views:
+                view.set_avatars(self.avatar_pixmaps)
+        message = f"✅ OCR engine ready ({detail}). " + ("Click Run to scan the selected area." if self.selected_area else "Select an area on screen to begin OCR analysis (Supports EN/CN)")
+        for warning in self.engine_warnings:
+            print(f"Warning: {warning}", file=sys.stderr)
+            message += f"\n⚠️ {warning}"
+        if self.profile_startup:
+            startup_timings['engine total'] = time.perf_counter() - _import_start
+            breakdown = format_breakdown({stage: seconds * 1000 for stage, seconds in startup_timings.items()})
+            print(f"Startup: {breakdown}", file=sys.stderr)
+            message += f"\n⏱ {breakdown}"
+        self.status_label.setText(message)
+
+    def scan_kwargs(self):
+        screen = QApplication.primaryScreen()
+        screen_key = (screen.size().width(), screen.size().height(), screen.devicePixelRatio())
+        return {'recognizer': self.template_recognizer, 'cache': self.ocr_cache, 'locator': self.locator,
+                'screen_key': screen_key, 'language': self.language_lock, 'stitch': self.stitch,
+                'cascade': self.ocr_cascade}
+
+    def analyze_screenshot(self, screenshot, interactive=True):
+        # Queue the scan on the worker; a newer request cancels this one
+        self.scan_blocks = {}
+        self.scan_interactive = interactive
+        return self.scan_controller.submit(screenshot, self.scan_kwargs(),
+                                           context={'interactive': interactive, 'grab_timings': self.grab_timings})
+
+    def on_block_done(self, scan_id, partial):
+        if scan_id != self.scan_controller.latest_id():
+            return
+        block = partial['block']
+        self.scan_blocks[(block['row'], block['col'])] = block
+        ocr_output = f"PARTIAL RESULTS ({partial['blocks_done']} blocks read):\n"
+        for (row, col), done in sorted(self.scan_blocks.items()):
+            ocr_output += f"Block ({row+1},{col+1}) [{done['lang']}]: {done['text'] or '---'}\n"
+        self.ocr_text.setPlainText(ocr_output)
+        self.show_tags(partial['tags'], partial['tag_confidence'])
+        self.display_filtered_operators(partial['combos'])
+        self.status_label.setText(f"🔄 {partial['blocks_done']} blocks read, {len(partial['tags'])} tags so far...")
+
+    def on_scan_failed(self, scan_id, message):
+        if scan_id != self.scan_controller.latest_id():
+            return
+        if self.scan_interactive:
+            QMessageBox.critical(self, "Error", f"OCR failed: {message}")
+        else:
+            self.watch_btn.setChecked(False)
+        self.status_label.setText(f"❌ OCR failed: {message}")
+
+    def on_slot_done(self, scan_id, slot):
+        if scan_id != self.scan_controller.latest_id():
+            return
+        result = slot['result']
+        self.slot_view(slot['slot']).set_result(format_tags(result['tags'], result['tag_confidence']), result['combos'])
+        self.status_label.setText(f"🔄 Slot {slot['slot'] + 1} read: {len(result['tags'])} tags, "
+                                  f"{len(result['combos'])} combinations...")
+
+    def show_tags(self, detected_tags, confidence):
+        self.detected_tags.setPlainText(format_tags(detected_tags, confidence))
+
+    def on_scan_finished(self, scan_id, payload):
+        screenshot, result, context = payload
+        if self.watch_scheduler is not None:
+            self.watch_busy += result['scan_seconds']
+        if scan_id != self.scan_controller.latest_id():
+            return
+        if 'slots' in result:
+            self.show_slots(screenshot, result, context)
+            return
+        tracer = get_tracer()
+        display_timings = {}
+        with tracer.span('display', display_timings):
             analysis_image = screenshot.copy()
             if analysis_image.mode != 'RGB':
                 analysis_image = analysis_image.convert('RGB')
             draw = ImageDraw.Draw(analysis_image)
 
-            width, height = screenshot.size
-            num_cols = 3
-            num_rows = 2
-            block_width = width / num_cols
-            block_height = height / num_rows
-            all_detected_text = []
-            ocr_results = []
-            
             split_block_color = (0, 255, 0)
             split_block_outline_width = 3
+            ocr_results = []
 
-            for row in range(num_rows):
-                for col in range(num_cols):
-                    if row == 1 and col == 2:
-                        continue
-                    x1 = int(col * block_width)
-                    y1 = int(row * block_height)
-                    x2 = int((col + 1) * block_width)
-                    y2 = int((row + 1) * block_height)
-
-                    draw.rectangle([x1, y1, x2, y2], outline=split_block_color, width=split_block_outline_width)
-                    block_image = screenshot.crop((x1, y1, x2, y2))
-                    block_filename = os.path.join("./temp/", f"block_r{row}_c{col}.png")
-
-                    processed_image = self.auto_crop_image_adaptive(block_image)
-                    processed_image = self.preprocess_image_for_ocr(processed_image)
-                    processed_image.save(block_filename)
-
-                    lang_choice, final_text = self.detect_language_and_text(processed_image)
-
-                    if final_text:
-                        all_detected_text.append(final_text)
-                        ocr_results.append(f"Block ({row+1},{col+1}) [{lang_choice}]: {final_text}")
-                    else:
-                        ocr_results.append(f"Block ({row+1},{col+1}) [{lang_choice}]: ---")
-            
-            analysis_image.save("./temp/analysis.png")
-            analysis_pixmap = QPixmap("./temp/analysis.png")
+            for block in result['blocks']:
+                row, col = block['row'], block['col']
+                draw.rectangle(list(block['box']), outline=split_block_color, width=split_block_outline_width)
+                if self.debug_dumper:
+                    self.debug_dumper.dump(block['image'], f"block_r{row}_c{col}.png")
+                label = block['source'] if block['source'] != "ocr" else block.get('tier')
+                source = f" {label}" if label else ""
+                ocr_results.append(f"Block ({row+1},{col+1}) [{block['lang']}{source}]: {block['text'] or '---'}")
+
+            if self.debug_dumper:
+                self.debug_dumper.dump(analysis_image, "analysis.png")
+            analysis_pixmap = QPixmap.fromImage(pil_to_qimage(analysis_image))
             target_size = self.analysis_preview_label.size()
             scaled_pixmap = analysis_pixmap.scaled(target_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
             self.analysis_preview_label.setPixmap(scaled_pixmap)
 
-            combined_text = " ".join(all_detected_text)
-            
-            ocr_output = "LANGUAGE-DETECTED SPLIT-BLOCK OCR RESULTS:\n"
-            for result in ocr_results:
-                ocr_output += f"{result}\n"
-            ocr_output += f"\nCOMBINED TEXT: {combined_text}"
+            ocr_output = f"LANGUAGE-DETECTED SPLIT-BLOCK OCR RESULTS ({result['layout']} layout):\n"
+            for line in ocr_results:
+                ocr_output += f"{line}\n"
+            ocr_output += f"\nCOMBINED TEXT: {result['text']}"
             self.ocr_text.setPlainText(ocr_output)
 
-            detected_tags = self.extract_tags_from_text(combined_text)
-            self.detected_tags.setPlainText(", ".join(detected_tags) if detected_tags else "No recruitment tags detected")
-            filtered_operators = self.get_operators_by_tags(detected_tags)
+            detected_tags = result['tags']
+            self.show_tags(detected_tags, result['tag_confidence'])
+            filtered_operators = result['combos']
             self.display_filtered_operators(filtered_operators)
 
-            self.status_label.setText(f"✅ analysis complete! {len(all_detected_text)} text blocks found, {len(detected_tags)} tags detected, {len(filtered_operators)} combinations found")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"OCR failed: {str(e)}")
-            self.status_label.setText(f"❌ OCR failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
-    def extract_tags_from_text(self, text):
-        detected_tags = []
-        text_clean = re.sub(r'[^\w\s\u4e00-\u9fff\-]', ' ', text.upper())
-
-        fuzzy_matches = {
-            "CUARD": "Guard", "GUARD": "Guard", "SNIPER": "Sniper",
-            "DEFENDER": "Defender", "MEDIC": "Medic", "SUPPORTER": "Supporter",
-            "CASTER": "Caster", "SPECIALIST": "Specialist", "VANGUARD": "Vanguard",
-            "MELEE": "Melee", "RANGED": "Ranged", "近卫": "Guard",
-            "狙击": "Sniper", "重装": "Defender", "医疗": "Medic",
-            "辅助": "Supporter", "术师": "Caster", "特种": "Specialist",
-            "先锋": "Vanguard", "近战": "Melee", "远程": "Ranged"
-        }
-
-        for category, tags in arknights_tags_by_category.items():
-            for eng_tag, chi_tag in tags.items():
-                pattern = r"\b" + re.escape(eng_tag.upper()) + r"\b"
-                if re.search(pattern, text_clean, re.IGNORECASE):
-                    detected_tags.append(eng_tag)
-                elif chi_tag and chi_tag in text:
-                    detected_tags.append(eng_tag)
-
-        for fuzzy_text, correct_tag in fuzzy_matches.items():
-            pattern = r"\b" + re.escape(fuzzy_text.upper()) + r"\b"
-            if re.search(pattern, text_clean, re.IGNORECASE) or fuzzy_text in text:
-                detected_tags.append(correct_tag)
-
-        seen = set()
-        ordered_unique_tags = []
-        for tag in detected_tags:
-            if tag not in seen:
-                seen.add(tag)
-                ordered_unique_tags.append(tag)
-
-        return ordered_unique_tags
-
-    def get_operators_by_tags(self, input_tags):
-        operators = []
-        with open('./data/operatordata_en.csv', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                op_tags = [t.strip() for t in row['tags_en'].split(';')]
-                op_rarity = int(row['rarity'])
-                
-                if op_rarity == 6 and 'Top Operator' not in input_tags:
-                    continue
-                    
-                operators.append({
-                    'name': row['name_en'],
-                    'rarity': op_rarity,
-                    'tags': op_tags
-                })
-
-        grouped_by_tags = defaultdict(list)
-
-        for op in operators:
-            match_tags = [t for t in input_tags if t in op['tags']]
-
-            if match_tags:
-                for r in range(1, len(match_tags) + 1):
-                    for combo in combinations(match_tags, r):
-                        grouped_by_tags[tuple(combo)].append(op)
-
-        result = []
-        for tags_tuple, ops_list in grouped_by_tags.items():
-            ops_list.sort(key=lambda x: x['rarity'], reverse=True)
-            
-            non_one_star_rarities = [op['rarity'] for op in ops_list if op['rarity'] > 1]
-            lowest_rarity = min(non_one_star_rarities) if non_one_star_rarities else 1
-            
-            result.append({
-                'match_count': len(tags_tuple),
-                'tags': list(tags_tuple),
-                'lowest_rarity': lowest_rarity,
-                'operators': ops_list
-            })
-
-        result.sort(key=lambda x: (x['lowest_rarity'], x['match_count']), reverse=True)
-        
-        for item in result:
-            del item['lowest_rarity']
-            
-        return result
+        text_blocks = sum(1 for block in result['blocks'] if block['text'])
+        cache_stats = self.ocr_cache.stats()
+        timings = {stage: seconds * 1000 for stage, seconds in context['grab_timings'].items()}
+        timings.update(result['timings'])
+        timings.update({stage: seconds * 1000 for stage, seconds in display_timings.items()})
+        counters = {'OCR calls': result['counters']['ocr_calls'], 'profile': result['ocr_profile'],
+                    'capture': self.capture.name}
+        if self.scan_controller.dropped:
+            counters['stale frames dropped'] = self.scan_controller.dropped
+        cascade_stats = self.ocr_cascade.stats() if self.ocr_cascade is not None else None
+        if cascade_stats and cascade_stats['blocks']:
+            counters['fast path'] = f"{cascade_stats['hit_rate']['fast']:.0%}"
+        self.status_label.setText(f"✅ analysis complete! {text_blocks} text blocks found, {len(detected_tags)} tags detected, {len(filtered_operators)} combinations found"
+                                  f" (cache {cache_stats['hits']} hits / {cache_stats['misses']} misses)\n"
+                                  f"⏱ {format_breakdown(timings, counters)}")
+
+    def show_slots(self, screenshot, result, context):
+        slots = result['slots']
+        display_timings = {}
+        with get_tracer().span('display', display_timings):
+            analysis_image = screenshot.convert('RGB') if screenshot.mode != 'RGB' else screenshot.copy()
+            draw = ImageDraw.Draw(analysis_image)
+            ocr_output = f"FULL-SCREEN SCAN ({len(slots)} slots found):\n"
+            tag_lines = []
+            for slot in slots:
+                slot_result = slot['result']
+                x1, y1 = slot['box'][:2]
+                draw.rectangle(list(slot['box']), outline=(255, 200, 0), width=4)
+                for block in slot_result['blocks']:
+                    box = block['box']
+                    draw.rectangle([box[0] + x1, box[1] + y1, box[2] + x1, box[3] + y1], outline=(0, 255, 0), width=3)
+                tags_text = format_tags(slot_result['tags'], slot_result['tag_confidence'])
+                self.slot_view(slot['slot']).set_result(tags_text, slot_result['combos'])
+                ocr_output += f"Slot {slot['slot'] + 1}: {slot_result['text'] or '---'}\n"
+                tag_lines.append(f"Slot {slot['slot'] + 1}: {tags_text}")
+            # Drop tabs left over from an earlier scan that found more slots
+            while len(self.slot_views) > len(slots):
+                view = self.slot_views.pop()
+                self.result_tabs.removeTab(self.result_tabs.indexOf(view))
+                view.deleteLater()
+            if self.slot_views:
+                self.result_tabs.setCurrentWidget(self.slot_views[0])
+
+            if self.debug_dumper:
+                self.debug_dumper.dump(analysis_image, "slots.png")
+            analysis_pixmap = QPixmap.fromImage(pil_to_qimage(analysis_image))
+            self.analysis_preview_label.setPixmap(analysis_pixmap.scaled(
+                self.analysis_preview_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.ocr_text.setPlainText(ocr_output)
+            self.detected_tags.setPlainText("\n".join(tag_lines) if tag_lines else "No tag panels found on screen")
+
+        timings = {stage: seconds * 1000 for stage, seconds in context['grab_timings'].items()}
+        timings.update(result['timings'])
+        timings.update({stage: seconds * 1000 for stage, seconds in display_timings.items()})
+        counters = {'OCR calls': result['counters'].get('ocr_calls', 0), 'capture': self.capture.name}
+        if not slots:
+            self.status_label.setText(f"⚠️ No recruitment tag panels found on screen\n⏱ {format_breakdown(timings)}")
+            return
+        self.status_label.setText(f"✅ {len(slots)} slots scanned from one capture, "
+                                  f"{sum(len(slot['result']['combos']) for slot in slots)} combinations found\n"
+                                  f"⏱ {format_breakdown(timings, counters)}")
 
     def display_filtered_operators(self, grouped_operators):
-        self.operators_list.clear()
-        self.operators_list.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        RARITY_COLOR = {
-            1: '#FFFFFF',
-            2: '#9E9E1E', 
-            3: '#0398D0',
-            4: '#CFB6CF',
-            5: '#FFE916',
-            6: "#FF8400"
-        }
-        
-        for group in grouped_operators:
-            container_widget = QWidget()
-            layout = QVBoxLayout(container_widget)
-            
-            tags_label = QLabel(f"Tags: {', '.join(group['tags'])}")
-            tags_label.setWordWrap(True)
-            layout.addWidget(tags_label)
-
-            operator_html = "Operator: "
-            for op in group['operators']:
-                color = RARITY_COLOR.get(op['rarity'], "#FFFFFF")
-                operator_html += f'<span style="color:{color}">{op["name"]}</span>, '
-            operator_html = operator_html.rstrip(", ")
-
-            operator_label = QLabel()
-            operator_label.setText(operator_html)
-            operator_label.setTextFormat(Qt.RichText)
-            operator_label.setWordWrap(True)
-            layout.addWidget(operator_label)
-
-            list_item = QListWidgetItem()
-            self.operators_list.addItem(list_item)
-            self.operators_list.setItemWidget(list_item, container_widget)
-            list_item.setSizeHint(layout.sizeHint())
+        self.operators_list.set_groups(grouped_operators)
 
+def format_tags(detected_tags, confidence):
+    tag_names = [tag if confidence[tag] >= 1.0 else f"{tag} ({confidence[tag]:.0%})" for tag in detected_tags]
+    return ", ".join(tag_names) if tag_names else "No recruitment tags detected"
 
 def main():
     compact_mode = '-C' in sys.argv or '-compact' in sys.argv
+    debug_dump = '--debug-dump' in sys.argv
+    use_templates = '--templates' in sys.argv
+    persist_cache = '--persist-cache' in sys.argv
+    use_grid = '--grid' in sys.argv
+    trace = '--trace' in sys.argv
+    ocr_profile = "dual" if '--dual-lang' in sys.argv else "auto"
+    profile_startup = '--profile-startup' in sys.argv
+    stitch = '--stitch' in sys.argv
+    use_cascade = '--cascade' in sys.argv
+    # --capture=mss|mss:<monitor>|pil|replay:<folder>; recorded frames need no display
+    capture_spec = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--capture=')), "auto")
+    start = time.perf_counter()
     app = QApplication(sys.argv)
+    if trace:
+        get_tracer().enabled = True
+        app.aboutToQuit.connect(lambda: print(f"Trace written to {get_tracer().export()}"))
     font = QFont()
     font.setPointSize(12)
     app.setFont(font)
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    try:
-        pytesseract.get_tesseract_version()
-    except:
-        QMessageBox.critical(None, "Error", "Tesseract OCR not found! Please install it with Chinese language support.")
-        sys.exit(1)
-    window = ArknightsOCRApp(compact_mode)
+    startup_timings['qt init'] = time.perf_counter() - start
+    start = time.perf_counter()
+    window = ArknightsOCRApp(compact_mode, debug_dump, use_templates, persist_cache, use_grid, ocr_profile,
+                             profile_startup, stitch, use_cascade, capture_spec)
     window.show()
+    app.aboutToQuit.connect(window.scan_controller.cancel_all)
+    startup_timings['window'] = time.perf_counter() - start
+    if profile_startup:
+        print(f"Window shown {(time.perf_counter() - _import_start) * 1000:.0f} ms after launch", file=sys.stderr)
+    window.start_engine()
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
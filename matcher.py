@@ -0,0 +1,162 @@
+import os
+import threading
+from itertools import combinations
+
+import numpy
+
+from answer_table import load_table
+from operator_index import load_index
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "operatordata_en.csv")
+TOP_OPERATOR_TAG = "Top Operator"
+
+
+class TagMatcher:
+    # Loads the prebuilt roster index (tag bits, uint64 operator masks) and
+    # answers tag-combination queries with bitwise ANDs. Full five-tag rolls
+    # are read straight from the precomputed answer table instead.
+    def __init__(self, csv_path=DEFAULT_CSV_PATH, use_table=True):
+        self.csv_path = csv_path
+        self.use_table = use_table
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.tag_bits = {}
+        self.tag_names = []
+        self.operators = []
+        self.avatars = {}
+        self.rarities = numpy.zeros(0, dtype=numpy.uint8)
+        self.masks = numpy.zeros(0, dtype=numpy.uint64)
+        self.table = None
+        self.reload()
+
+    def reload(self):
+        mtime = os.path.getmtime(self.csv_path)
+        index = load_index(self.csv_path)
+        tag_names = index['tags']
+        tag_bits = {tag: bit for bit, tag in enumerate(tag_names)}
+        operators = [{
+            'id': op_id,
+            'name': name,
+            'rarity': rarity,
+            'tags': [tag_names[bit] for bit in bits if bit >= 0]
+        } for op_id, name, rarity, bits in zip(index['ids'], index['names_en'], index['rarities'].tolist(),
+                                               index['tag_matrix'].tolist())]
+        avatars = {op_id: avatar for op_id, avatar in zip(index['ids'], index['avatars']) if avatar}
+        table = None
+        if self.use_table:
+            try:
+                table = load_table(self.csv_path)
+            except ValueError:
+                table = None
+
+        with self._lock:
+            self.tag_bits = tag_bits
+            self.tag_names = tag_names
+            self.table = table
+            self.operators = operators
+            self.avatars = avatars
+            self.rarities = index['rarities']
+            self.masks = index['masks']
+            self._mtime = mtime
+
+    def refresh(self):
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self.reload()
+        return True
+
+    def tag_mask(self, tags):
+        mask = 0
+        for tag in tags:
+            bit = self.tag_bits.get(tag)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def match(self, input_tags):
+        self.refresh()
+        with self._lock:
+            tag_bits = self.tag_bits
+            tag_names = self.tag_names
+            operators = self.operators
+            rarities = self.rarities
+            masks = self.masks
+            table = self.table
+
+        # Known tags in roster bit order, so a roll ranks the same whatever
+        # order OCR read its tags in
+        input_tags = list(dict.fromkeys(input_tags))
+        known_tags = sorted((t for t in input_tags if t in tag_bits), key=tag_bits.get)
+        if not known_tags or not operators:
+            return []
+        if table is not None:
+            groups = table.lookup(input_tags, operators, tag_names)
+            if groups is not None:
+                return groups
+
+        return [{
+            'match_count': len(combo),
+            'tags': list(combo),
+            'lowest_rarity': lowest_rarity,
+            'operators': [operators[i] for i in ranked]
+        } for combo, ranked, lowest_rarity in rank_combos(known_tags, TOP_OPERATOR_TAG in input_tags, tag_bits,
+                                                           masks, rarities)]
+
+
+def rank_combos(known_tags, top_allowed, tag_bits, masks, rarities):
+    # -> [(combo, ranked operator indices, guaranteed rarity)], best first.
+    # Every combination of the known tags is tested against all operator
+    # masks at once; rarity-6 operators only count with Top Operator.
+    combos = []
+    combo_masks = []
+    for r in range(1, len(known_tags) + 1):
+        for combo in combinations(known_tags, r):
+            combos.append(combo)
+            combo_masks.append(sum(1 << tag_bits[t] for t in combo))
+    combo_masks = numpy.array(combo_masks, dtype=numpy.uint64)[:, None]
+
+    hits = (masks[None, :] & combo_masks) == combo_masks
+    if not top_allowed:
+        hits &= rarities[None, :] != 6
+
+    groups = []
+    for order, (combo, row) in enumerate(zip(combos, hits)):
+        idx = numpy.flatnonzero(row)
+        if idx.size == 0:
+            continue
+        ranked, lowest_rarity = rank_operators(idx, rarities)
+        groups.append(((int(idx[0]), order), lowest_rarity, len(combo), (combo, ranked, lowest_rarity)))
+    return order_groups(groups)
+
+
+def rank_operators(idx, rarities):
+    # -> (operator indices by rarity, highest first, guaranteed rarity)
+    combo_rarities = rarities[idx]
+    ranked = idx[numpy.argsort(-combo_rarities.astype(numpy.int16), kind='stable')]
+    above_one = combo_rarities[combo_rarities > 1]
+    return ranked, int(above_one.min()) if above_one.size else 1
+
+
+def order_groups(groups):
+    # groups: [((first operator, combination order), guaranteed rarity, tag count, payload)]
+    # Keep the ordering the CSV scan produced: groups appear in the order
+    # their first operator was read, then best guaranteed rarity wins.
+    groups.sort(key=lambda g: g[0])
+    groups.sort(key=lambda g: (g[1], g[2]), reverse=True)
+    return [group[3] for group in groups]
+
+
+_shared_matcher = None
+_shared_lock = threading.Lock()
+
+
+def get_matcher(csv_path=DEFAULT_CSV_PATH):
+    global _shared_matcher
+    with _shared_lock:
+        if _shared_matcher is None or _shared_matcher.csv_path != csv_path:
+            _shared_matcher = TagMatcher(csv_path)
+        return _shared_matcher
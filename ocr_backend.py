@@ -0,0 +1,185 @@
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy
+import pytesseract
+
+from ocr_profile import PROFILES
+
+DEFAULT_PROFILE = PROFILES["dual"]
+BACKEND_NAMES = ("auto", "tesserocr", "pytesseract")
+DEFAULT_POOL_SIZE = 5
+
+
+class PytesseractBackend:
+    # Fallback path: one tesseract subprocess per call, model reloaded each time.
+    name = "pytesseract"
+
+    def __init__(self, profile=DEFAULT_PROFILE):
+        self.profile = profile
+        self.config = profile.config()
+
+    def image_to_string(self, image, psm=None):
+        config = self.config if psm is None or psm == self.profile.psm else self.profile.config(psm)
+        return pytesseract.image_to_string(image, config=config)
+
+    def image_to_data(self, image, psm=None):
+        # -> recognised words as {'text', 'box': (x1, y1, x2, y2), 'conf'}
+        config = self.config if psm is None or psm == self.profile.psm else self.profile.config(psm)
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(data['text']):
+            if data['level'][i] != 5 or not text.strip():
+                continue
+            left, top = data['left'][i], data['top'][i]
+            words.append({'text': text.strip(), 'box': (left, top, left + data['width'][i], top + data['height'][i]),
+                          'conf': float(data['conf'][i])})
+        return words
+
+    def warm_up(self):
+        pytesseract.get_tesseract_version()
+
+    def close(self):
+        pass
+
+
+class TesserocrBackend:
+    # Persistent in-process engines. A TessBaseAPI handle is not thread-safe,
+    # so a small pool of handles is loaded once and checked out per call.
+    name = "tesserocr"
+
+    def __init__(self, profile=DEFAULT_PROFILE, pool_size=DEFAULT_POOL_SIZE):
+        import tesserocr
+        self.profile = profile
+        self._handles = queue.Queue()
+        self._all_handles = []
+        for _ in range(max(1, pool_size)):
+            api = tesserocr.PyTessBaseAPI(lang=profile.lang, psm=profile.psm, variables=profile.variables())
+            self._handles.put(api)
+            self._all_handles.append(api)
+
+    def _set_image(self, api, image, psm):
+        api.SetPageSegMode(self.profile.psm if psm is None else psm)
+        if isinstance(image, numpy.ndarray):
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        else:
+            api.SetImage(image)
+
+    def image_to_string(self, image, psm=None):
+        api = self._handles.get()
+        try:
+            self._set_image(api, image, psm)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._handles.put(api)
+
+    def image_to_data(self, image, psm=None):
+        from tesserocr import RIL, iterate_level
+        api = self._handles.get()
+        try:
+            self._set_image(api, image, psm)
+            api.Recognize()
+            words = []
+            iterator = api.GetIterator()
+            if iterator is not None:
+                for word in iterate_level(iterator, RIL.WORD):
+                    text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+                    box = word.BoundingBox(RIL.WORD)
+                    if text and box:
+                        words.append({'text': text, 'box': tuple(box), 'conf': word.Confidence(RIL.WORD)})
+            return words
+        finally:
+            api.Clear()
+            self._handles.put(api)
+
+    def warm_up(self):
+        pass
+
+    def close(self):
+        for api in self._all_handles:
+            api.End()
+        self._all_handles = []
+
+
+def create_backend(name="auto", pool_size=DEFAULT_POOL_SIZE, profile=DEFAULT_PROFILE):
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"Unknown OCR backend {name!r}, expected one of {', '.join(BACKEND_NAMES)}")
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend(profile, pool_size=pool_size)
+        except Exception as e:
+            if name == "tesserocr":
+                raise
+            print(f"tesserocr unavailable ({e}), falling back to pytesseract", file=sys.stderr)
+    return PytesseractBackend(profile)
+
+
+# One engine pool per profile, so a language lock never reloads a model
+_backends = {}
+_backend_name = os.environ.get("ARKNIGHTS_OCR_BACKEND", "auto")
+_backend_lock = threading.Lock()
+_executor = None
+
+
+def set_backend_name(name):
+    global _backend_name
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"Unknown OCR backend {name!r}, expected one of {', '.join(BACKEND_NAMES)}")
+    with _backend_lock:
+        if name != _backend_name:
+            for backend in _backends.values():
+                backend.close()
+            _backends.clear()
+        _backend_name = name
+
+
+def get_backend(profile=DEFAULT_PROFILE):
+    with _backend_lock:
+        backend = _backends.get(profile.name)
+        if backend is None:
+            backend = _backends[profile.name] = create_backend(_backend_name, profile=profile)
+        return backend
+
+
+def warm_up_ocr(profile=DEFAULT_PROFILE):
+    # One OCR on a blank strip so model files are loaded and cached before the first scan
+    get_backend(profile).image_to_string(numpy.full((32, 96), 255, dtype=numpy.uint8))
+
+
+def _reset_after_fork():
+    # Threads and engine handles do not survive fork; children build their own.
+    global _executor, _backend_lock
+    _backends.clear()
+    _executor = None
+    _backend_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_executor():
+    global _executor
+    with _backend_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_POOL_SIZE, thread_name_prefix="ocr")
+        return _executor
+
+
+def iter_blocks(func, items):
+    # Blocks are independent, so run them side by side on a long-lived pool.
+    # Yields (item, result) as each block finishes and drops blocks that have
+    # not started if the caller stops iterating.
+    futures = {_get_executor().submit(func, item): item for item in items}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
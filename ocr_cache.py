@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy
+
+from template_ocr import normalize_glyphs
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TOLERANCE = 24
+HASH_SIZE = (32, 8)
+HASH_DEAD_ZONE = 4
+DEFAULT_DB_PATH = "./cache/ocr_cache.sqlite3"
+
+
+def difference_hash(image, hash_size=HASH_SIZE, dead_zone=HASH_DEAD_ZONE):
+    # Gradient signs of a tiny grayscale thumbnail packed into an int. Flat
+    # areas fall inside the dead zone so capture noise cannot flip their bits.
+    gray = image if isinstance(image, numpy.ndarray) else numpy.asarray(image.convert('L'))
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    width, height = hash_size
+    small = cv2.resize(gray, (width + 1, height), interpolation=cv2.INTER_AREA).astype(numpy.int16)
+    diff = small[:, 1:] - small[:, :-1]
+    bits = numpy.concatenate(((diff > dead_zone).ravel(), (diff < -dead_zone).ravel()))
+    return int.from_bytes(numpy.packbits(bits).tobytes(), 'big')
+
+
+def block_key(image):
+    # Hash the tight text crop so a pixel of crop jitter does not change the key
+    gray = image if isinstance(image, numpy.ndarray) else numpy.asarray(image.convert('L'))
+    glyphs = normalize_glyphs(gray)
+    return difference_hash(gray if glyphs is None else glyphs)
+
+
+class OCRCache:
+    # In-memory LRU of OCR results keyed by the dHash of each preprocessed
+    # block, optionally backed by SQLite so results survive restarts.
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, tolerance=DEFAULT_TOLERANCE, db_path=None):
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS ocr_cache (hash TEXT PRIMARY KEY, lang TEXT, text TEXT, used REAL)")
+        self._db.commit()
+        rows = self._db.execute("SELECT hash, lang, text FROM ocr_cache ORDER BY used DESC LIMIT ?",
+                                (self.max_entries,)).fetchall()
+        for hash_hex, lang, text in reversed(rows):
+            self._entries[int(hash_hex, 16)] = (lang, text)
+
+    def _find(self, key):
+        if key in self._entries:
+            return key
+        if self.tolerance <= 0:
+            return None
+        best_key, best_distance = None, self.tolerance + 1
+        for candidate in self._entries:
+            distance = (candidate ^ key).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = candidate, distance
+        return best_key
+
+    def get(self, image):
+        key = block_key(image)
+        with self._lock:
+            found = self._find(key)
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(found)
+            return self._entries[found]
+
+    def put(self, image, result):
+        key = block_key(image)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO ocr_cache VALUES (?, ?, ?, julianday('now'))",
+                                 (format(key, 'x'), result[0], result[1]))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM ocr_cache")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,146 @@
+import threading
+
+import cv2
+
+from ocr_profile import PSM_SINGLE_LINE
+from stitch import dark_on_light
+from tags import extract_tag_hits
+
+# empty: nothing read at full preprocessing; unsettled: every tier read text
+# but none settled it; error: the engine raised
+TIERS = ("fast", "heavy", "threshold", "empty", "unsettled", "error")
+# Tesseract word confidences run 0-100; one weak word sends the block on
+MIN_WORD_CONFIDENCE = 70.0
+MIN_TAG_CONFIDENCE = 0.8
+# Below this the native crop is too small for Tesseract to be worth a try
+MIN_FAST_HEIGHT = 20
+ADAPTIVE_BLOCK_SIZE = 31
+ADAPTIVE_C = 10
+
+
+def otsu_threshold(gray):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return dark_on_light(binary)
+
+
+def adaptive_threshold(gray):
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                   ADAPTIVE_BLOCK_SIZE, ADAPTIVE_C)
+    return dark_on_light(binary)
+
+
+THRESHOLDS = (otsu_threshold, adaptive_threshold)
+
+
+def fast_read(block, backend, profile):
+    # -> (image, psm) for the cheap first read, or None to start heavy.
+    # Before the language lock engages a single-language guess fails for
+    # the other client, so unlocked blocks start at the heavy tier. With an
+    # engine in memory the native crop is the cheap read; with pytesseract
+    # every call is a subprocess whose startup a smaller image barely dents,
+    # so the cheap read is one single-line pass over the upscaled crop, the
+    # call the heavy tier would make for a one-line tag anyway.
+    if profile is None or profile.name == "dual":
+        return None
+    if getattr(backend, 'name', None) == "pytesseract":
+        return block['image'], PSM_SINGLE_LINE
+    native = block.get('native')
+    if native is None or native.shape[0] < MIN_FAST_HEIGHT:
+        return None
+    return dark_on_light(native), profile.psm_for(native)
+
+
+def read_words(image, backend, psm=None):
+    # -> (text, weakest word confidence); no words reads as ("", 0)
+    words = backend.image_to_data(image, psm=psm)
+    if not words:
+        return "", 0.0
+    return " ".join(word['text'] for word in words), min(word['conf'] for word in words)
+
+
+class OCRCascade:
+    # Cheapest read first, heavier ones only for blocks it cannot settle:
+    #   fast      locked language only: the native-resolution crop, or with
+    #             pytesseract a single-line read of the upscaled crop
+    #   heavy     the 2x upscaled, contrast-boosted crop, current profile
+    #   threshold the heavy crop binarized a few other ways
+    # A read settles the block when every word is confident and the text
+    # resolves to a known tag. Blocks nothing settles keep the best heavy or
+    # threshold read, so hard captures never do worse than the heavy path.
+    def __init__(self, min_confidence=MIN_WORD_CONFIDENCE, min_tag_confidence=MIN_TAG_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.min_tag_confidence = min_tag_confidence
+        self.hits = dict.fromkeys(TIERS, 0)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def tag_confidence(self, text):
+        # Weakest tag hit in the text, 0 when it names no tag
+        hits = extract_tag_hits(text)
+        return min(hit.confidence for hit in hits) if hits else 0.0
+
+    def settled(self, text, confidence):
+        return confidence >= self.min_confidence and self.tag_confidence(text) >= self.min_tag_confidence
+
+    def read(self, block, backend, profile=None):
+        # -> (text, tier, OCR calls made). An engine error ends the block
+        # with no text; the calls it made still count.
+        calls = 0
+
+        def ocr(image, psm):
+            nonlocal calls
+            calls += 1
+            return read_words(image, backend, psm)
+
+        try:
+            text, tier = self._read(block, backend, profile, ocr)
+        except Exception:
+            text, tier = "", "error"
+        return self._done(text, tier, calls)
+
+    def _read(self, block, backend, profile, ocr):
+        image = block['image']
+        psm = profile.psm_for(image) if profile and profile.constrained else None
+        fast = fast_read(block, backend, profile)
+        if fast is not None:
+            text, confidence = ocr(*fast)
+            if self.settled(text, confidence):
+                return text, "fast"
+        if fast is None or fast[0] is not image or fast[1] != psm:
+            # Skipped when the fast read was this very call
+            text, confidence = ocr(image, psm)
+            if self.settled(text, confidence):
+                return text, "heavy"
+        if not text:
+            # Nothing to read at full preprocessing: an empty box, not a hard one
+            return text, "empty"
+
+        best = (self.tag_confidence(text), confidence, text)
+        for threshold in THRESHOLDS:
+            candidate, candidate_confidence = ocr(threshold(image), psm)
+            if self.settled(candidate, candidate_confidence):
+                return candidate, "threshold"
+            best = max(best, (self.tag_confidence(candidate), candidate_confidence, candidate), key=lambda read: read[:2])
+        return best[2], "unsettled"
+
+    def _done(self, text, tier, calls):
+        with self._lock:
+            self.hits[tier] += 1
+            self.calls += calls
+        return text, tier, calls
+
+    def stats(self):
+        with self._lock:
+            blocks = sum(self.hits.values())
+            return {
+                'blocks': blocks,
+                'ocr_calls': self.calls,
+                'calls_per_block': round(self.calls / blocks, 3) if blocks else 0.0,
+                'hits': dict(self.hits),
+                'hit_rate': {tier: round(hits / blocks, 3) if blocks else 0.0 for tier, hits in self.hits.items()}
+            }
+
+    def clear(self):
+        with self._lock:
+            self.hits = dict.fromkeys(TIERS, 0)
+            self.calls = 0
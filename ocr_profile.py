@@ -0,0 +1,182 @@
+import os
+import re
+import tempfile
+import threading
+
+import cv2
+import numpy
+
+from tags import arknights_tags_by_category
+
+DEFAULT_VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "tesseract")
+PSM_SINGLE_BLOCK = 6
+PSM_SINGLE_LINE = 7
+LANGUAGE_CODES = {"ENG": "eng", "CHI": "chi_sim"}
+PROFILE_NAMES = ("auto", "dual", "eng", "chi_sim")
+MAX_LOCKED_MISSES = 2
+MIN_BAND_HEIGHT_RATIO = 0.15
+
+
+def latin_words():
+    words = set()
+    for tags in arknights_tags_by_category.values():
+        for eng_tag in tags:
+            for word in re.split(r'[\s\-]+', eng_tag):
+                words.update((word, word.upper()))
+            words.update((eng_tag, eng_tag.upper()))
+    return sorted(words)
+
+
+def cjk_words():
+    return sorted({chi_tag for tags in arknights_tags_by_category.values() for chi_tag in tags.values() if chi_tag})
+
+
+def character_whitelist(lang):
+    if lang == "chi_sim":
+        return "".join(sorted(set("".join(cjk_words()))))
+    return "".join(sorted(set("".join(latin_words())) - {" "}))
+
+
+def write_vocabulary(lang, directory=DEFAULT_VOCAB_DIR):
+    # Tesseract reads one dictionary word per line; returns the user-words path
+    os.makedirs(directory, exist_ok=True)
+    words = cjk_words() if lang == "chi_sim" else latin_words()
+    path = os.path.join(directory, f"{lang}.user-words")
+    content = "\n".join(words) + "\n"
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == content:
+                return path
+    except OSError:
+        pass
+    # Parallel workers may be loading the file: write a private temp file
+    # next to it and swap it in whole
+    fd, temp_path = tempfile.mkstemp(prefix=f"{lang}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class OCRProfile:
+    # Which traineddata to load and how far to constrain the search. The
+    # dual profile is the original unconstrained chi_sim+eng setup.
+    def __init__(self, name, lang, psm=PSM_SINGLE_BLOCK, constrained=False):
+        self.name = name
+        self.lang = lang
+        self.psm = psm
+        self.constrained = constrained
+        self._variables = None
+
+    def variables(self):
+        if not self.constrained:
+            return {}
+        if self._variables is None:
+            self._variables = {
+                'tessedit_char_whitelist': character_whitelist(self.lang),
+                'user_words_file': os.path.abspath(write_vocabulary(self.lang)),
+                'load_system_dawg': '0',
+                'load_freq_dawg': '0'
+            }
+        return self._variables
+
+    def config(self, psm=None):
+        # Command-line form for pytesseract
+        args = [f"--psm {psm or self.psm}", f"-l {self.lang}"]
+        for key, value in self.variables().items():
+            if key == 'user_words_file':
+                args.append(f'--user-words "{value}"')
+            else:
+                args.append(f"-c {key}={value}")
+        return " ".join(args)
+
+    def psm_for(self, image):
+        return choose_psm(image) if self.constrained else self.psm
+
+    def __repr__(self):
+        return f"OCRProfile({self.name!r}, {self.lang}, psm={self.psm})"
+
+
+PROFILES = {
+    "dual": OCRProfile("dual", "chi_sim+eng"),
+    "eng": OCRProfile("eng", "eng", PSM_SINGLE_LINE, constrained=True),
+    "chi_sim": OCRProfile("chi_sim", "chi_sim", PSM_SINGLE_LINE, constrained=True)
+}
+
+
+def text_bands(image):
+    # Horizontal ink bands of a dark-on-light or light-on-dark text crop
+    gray = image if isinstance(image, numpy.ndarray) else numpy.asarray(image.convert('L'))
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if binary.mean() > 127:
+        binary = 255 - binary
+    rows = binary.any(axis=1)
+    edges = numpy.flatnonzero(numpy.diff(numpy.concatenate(([0], rows.astype(numpy.int8), [0]))))
+    min_height = max(1, int(gray.shape[0] * MIN_BAND_HEIGHT_RATIO))
+    return sum(1 for start, end in zip(edges[::2], edges[1::2]) if end - start >= min_height)
+
+
+def choose_psm(image):
+    # Tag labels are one line; wrapped or noisy crops keep the block segmenter
+    return PSM_SINGLE_LINE if text_bands(image) <= 1 else PSM_SINGLE_BLOCK
+
+
+class LanguageLock:
+    # Starts on the dual-language profile, locks to the client language once
+    # a scan finds tags, and unlocks again if the locked profile keeps
+    # missing tags that a dual reread finds (wrong lock or client switched).
+    def __init__(self, mode="auto"):
+        if mode not in PROFILE_NAMES:
+            raise ValueError(f"Unknown OCR profile {mode!r}, expected one of {', '.join(PROFILE_NAMES)}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.locked = None if self.mode == "auto" else self.mode
+            self._misses = 0
+
+    def profile(self):
+        with self._lock:
+            return PROFILES[self.locked or "dual"]
+
+    def retry_profile(self, profile, blocks):
+        # A locked read that found text but no tag is read again with the
+        # dual profile before the lock takes the blame. -> the profile to
+        # retry with, or None (unlocked, a fixed profile, or nothing read)
+        if self.mode != "auto" or profile is None or profile.name == "dual":
+            return None
+        if not any(block.get('text') for block in blocks):
+            return None
+        return PROFILES["dual"]
+
+    def observe(self, blocks, tags, retried=False):
+        # retried: the locked read found no tags and blocks/tags come from the
+        # dual reread. Tags there mean the lock missed them, a miss; none
+        # there either means a screen without tags, which says nothing.
+        if self.mode != "auto":
+            return
+        read = [block['lang'] for block in blocks if block.get('text')]
+        with self._lock:
+            if self.locked is None:
+                if tags and read:
+                    majority = max(set(read), key=read.count)
+                    self.locked = LANGUAGE_CODES.get(majority)
+                return
+            if retried and not tags:
+                return
+            if retried or (read and not tags):
+                self._misses += 1
+                if self._misses >= MAX_LOCKED_MISSES:
+                    self.locked = None
+                    self._misses = 0
+            else:
+                self._misses = 0
@@ -0,0 +1,138 @@
+import csv
+import hashlib
+import os
+import struct
+
+import numpy
+
+from binfile import aligned, padded, write_atomic
+
+INDEX_MAGIC = b"AKOI"
+INDEX_VERSION = 1
+# magic, version, operators, tags, tags per operator, sha256 of the source CSV
+HEADER = struct.Struct('<4sHIHH32s')
+STRING_KEYS = ('tags', 'ids', 'names_en', 'names_cn', 'avatars')
+MAX_TAG_BITS = 64
+DEFAULT_AVATAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "avatars")
+
+
+def index_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".idx"
+
+
+def file_checksum(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def compile_index(csv_path, avatar_dir=DEFAULT_AVATAR_DIR):
+    # CSV -> arrays and string lists: bit per tag in first-seen order, uint64
+    # mask per operator and each operator's tags as bit indices in CSV order
+    tag_bits = {}
+    ids, names_en, names_cn, rarities, masks, tag_lists = [], [], [], [], [], []
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            op_tags = [t.strip() for t in row['tags_en'].split(';') if t.strip()]
+            mask = 0
+            bits = []
+            for tag in op_tags:
+                if tag not in tag_bits:
+                    if len(tag_bits) >= MAX_TAG_BITS:
+                        raise ValueError(f"Roster uses more than {MAX_TAG_BITS} distinct tags")
+                    tag_bits[tag] = len(tag_bits)
+                mask |= 1 << tag_bits[tag]
+                bits.append(tag_bits[tag])
+            ids.append(row['id'])
+            names_en.append(row['name_en'])
+            names_cn.append(row['name_cn'])
+            rarities.append(int(row['rarity']))
+            masks.append(mask)
+            tag_lists.append(bits)
+
+    width = max((len(bits) for bits in tag_lists), default=0)
+    tag_matrix = numpy.full((len(tag_lists), width), -1, dtype=numpy.int8)
+    for i, bits in enumerate(tag_lists):
+        tag_matrix[i, :len(bits)] = bits
+
+    avatars = set(os.listdir(avatar_dir)) if avatar_dir and os.path.isdir(avatar_dir) else set()
+    return {
+        'checksum': file_checksum(csv_path),
+        'masks': numpy.array(masks, dtype=numpy.uint64),
+        'rarities': numpy.array(rarities, dtype=numpy.uint8),
+        'tag_matrix': tag_matrix,
+        'tags': sorted(tag_bits, key=tag_bits.get),
+        'ids': ids,
+        'names_en': names_en,
+        'names_cn': names_cn,
+        'avatars': [f"{op_id}.png" if f"{op_id}.png" in avatars else "" for op_id in ids]
+    }
+
+
+def pack_index(arrays):
+    # Header, then 8-byte aligned raw arrays, then NUL-joined UTF-8 strings
+    count, width = arrays['tag_matrix'].shape
+    strings = "\0".join("\0".join(arrays[key]) for key in STRING_KEYS).encode('utf-8')
+    header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, count, len(arrays['tags']), width, arrays['checksum'])
+    return (padded(header) + padded(arrays['masks'].tobytes()) + padded(arrays['rarities'].tobytes()) +
+            padded(arrays['tag_matrix'].tobytes()) + strings)
+
+
+def unpack_index(data):
+    magic, version, count, tag_count, width, checksum = HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC or version != INDEX_VERSION:
+        raise ValueError("Operator index has an unknown format or version")
+    offset = aligned(HEADER.size)
+    masks = numpy.frombuffer(data, dtype=numpy.uint64, count=count, offset=offset)
+    offset += aligned(count * 8)
+    rarities = numpy.frombuffer(data, dtype=numpy.uint8, count=count, offset=offset)
+    offset += aligned(count)
+    tag_matrix = numpy.frombuffer(data, dtype=numpy.int8, count=count * width, offset=offset).reshape(count, width)
+    offset += aligned(count * width)
+    strings = data[offset:].decode('utf-8').split("\0")
+    arrays = {'checksum': checksum, 'masks': masks, 'rarities': rarities, 'tag_matrix': tag_matrix,
+              'tags': strings[:tag_count]}
+    position = tag_count
+    for key in STRING_KEYS[1:]:
+        arrays[key] = strings[position:position + count]
+        position += count
+    return arrays
+
+
+def build_index(csv_path, index_path=None, avatar_dir=DEFAULT_AVATAR_DIR):
+    index_path = index_path or index_path_for(csv_path)
+    arrays = compile_index(csv_path, avatar_dir)
+    write_atomic(index_path, pack_index(arrays))
+    return arrays
+
+
+def load_index(csv_path, index_path=None):
+    # Loads the prebuilt index, rebuilding it when it is missing, from an
+    # older version, or older than the CSV with a different checksum. The
+    # file is read in one go rather than mapped so Windows can replace it.
+    index_path = index_path or index_path_for(csv_path)
+    try:
+        with open(index_path, 'rb') as f:
+            arrays = unpack_index(f.read())
+        if os.path.getmtime(csv_path) <= os.path.getmtime(index_path):
+            return arrays
+        if arrays['checksum'] == file_checksum(csv_path):
+            os.utime(index_path)
+            return arrays
+    except (OSError, ValueError, struct.error):
+        pass
+    try:
+        return build_index(csv_path, index_path)
+    except OSError:
+        # Read-only data directory: use the compiled arrays without saving them
+        return compile_index(csv_path)
+
+
+def main():
+    from matcher import DEFAULT_CSV_PATH
+    arrays = build_index(DEFAULT_CSV_PATH)
+    print(f"Index written to {index_path_for(DEFAULT_CSV_PATH)}: {len(arrays['ids'])} operators, "
+          f"{len(arrays['tags'])} tags, {sum(1 for avatar in arrays['avatars'] if avatar)} avatars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cv2
+import numpy
+from PIL import Image, ImageEnhance
+
+from instrument import get_tracer
+from localize import find_tag_panels, inset_box
+from matcher import get_matcher
+from ocr_backend import get_backend, iter_blocks
+from preprocess import DEFAULT_CONFIG, PreparedFrame
+from stitch import ocr_stitched
+from tags import extract_tag_hits
+
+NUM_COLS = 3
+NUM_ROWS = 2
+SKIPPED_CELLS = {(1, 2)}
+MAX_SLOT_WORKERS = 4
+
+
+def preprocess_image_for_ocr(image):
+    if image.mode != 'L':
+        image = image.convert('L')
+    width, height = image.size
+    image = image.resize((width * 2, height * 2), Image.LANCZOS)
+    enhancer = ImageEnhance.Contrast(image)
+    image = enhancer.enhance(1.5)
+    return image
+
+
+def auto_crop_image_adaptive(image_pillow):
+    try:
+        img_np_rgb = numpy.array(image_pillow)
+        img_np_bgr = cv2.cvtColor(img_np_rgb, cv2.COLOR_RGB2BGR)
+        gray = cv2.cvtColor(img_np_bgr, cv2.COLOR_BGR2GRAY)
+        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if contours:
+            largest_contour = max(contours, key=cv2.contourArea)
+            x, y, w, h = cv2.boundingRect(largest_contour)
+            padding = -10
+            x = max(0, x - padding)
+            y = max(0, y - padding)
+            w = min(img_np_bgr.shape[1] - x, w + 2 * padding)
+            h = min(img_np_bgr.shape[0] - y, h + 2 * padding)
+            cropped_img_np = img_np_bgr[y:y+h, x:x+w]
+            cropped_img_rgb = cv2.cvtColor(cropped_img_np, cv2.COLOR_BGR2RGB)
+            cropped_pillow_image = Image.fromarray(cropped_img_rgb)
+            return cropped_pillow_image
+        return image_pillow
+    except Exception as e:
+        print(f"Auto-crop failed: {e}")
+        return image_pillow
+
+
+def classify_text(text):
+    text = text.strip()
+    if not text:
+        return "ENG", ""
+    if re.search(r'[\u4e00-\u9fff]', text):
+        return "CHI", text
+    return "ENG", text
+
+
+def detect_language_and_text(image, backend=None, psm=None):
+    try:
+        backend = backend or get_backend()
+        return classify_text(backend.image_to_string(image) if psm is None else backend.image_to_string(image, psm=psm))
+    except Exception:
+        return "ENG", ""
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+def split_blocks(width, height):
+    block_width = width / NUM_COLS
+    block_height = height / NUM_ROWS
+    boxes = []
+    for row in range(NUM_ROWS):
+        for col in range(NUM_COLS):
+            if (row, col) in SKIPPED_CELLS:
+                continue
+            x1 = int(col * block_width)
+            y1 = int(row * block_height)
+            x2 = int((col + 1) * block_width)
+            y2 = int((row + 1) * block_height)
+            boxes.append((row, col, (x1, y1, x2, y2)))
+    return boxes
+
+
+def prepare_scan(image, config=DEFAULT_CONFIG, recognizer=None, cache=None, locator=None, screen_key=None,
+                 placed=None, block_done=None):
+    # Locate and crop the blocks, then answer what the cache and templates
+    # can. -> scan state; state['ocr_blocks'] still need Tesseract.
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    tracer = get_tracer()
+    timings = {}
+    blocks = []
+
+    def done(block):
+        if block_done is not None:
+            block_done(block)
+
+    with tracer.span('preprocess', timings):
+        frame = PreparedFrame(image, config)
+        if placed:
+            layout = "slot"
+        else:
+            with tracer.span('locate'):
+                placed, layout = locator.locate(frame.gray, screen_key) if locator else (None, "grid")
+        if placed:
+            for row, col, box in placed:
+                crop = inset_box(box)
+                blocks.append({'row': row, 'col': col, 'box': box, 'image': frame.block(crop, refine=False),
+                               'native': frame.native_block(crop)})
+        else:
+            for row, col, box in split_blocks(*image.size):
+                crop = frame.crop_box(box)
+                blocks.append({'row': row, 'col': col, 'box': box, 'image': frame.block(crop, refine=False),
+                               'native': frame.native_block(crop)})
+
+    # Cache hits and confident template matches skip Tesseract; the rest fall back to OCR
+    ocr_blocks = blocks
+    if cache is not None:
+        with tracer.span('cache', timings):
+            ocr_blocks = []
+            for block in blocks:
+                cached = cache.get(block['image'])
+                if cached:
+                    block['lang'], block['text'] = cached
+                    block['source'] = "cache"
+                    done(block)
+                else:
+                    ocr_blocks.append(block)
+
+    if recognizer is not None:
+        with tracer.span('template', timings):
+            pending = ocr_blocks
+            ocr_blocks = []
+            for block in pending:
+                with tracer.span('template_block', row=block['row'], col=block['col']):
+                    result, match = recognizer.recognize(block['image'])
+                block['confidence'] = match.confidence if match else None
+                if result:
+                    block['lang'], block['text'] = result
+                    block['source'] = "template"
+                    if cache is not None:
+                        cache.put(block['image'], result)
+                    done(block)
+                else:
+                    ocr_blocks.append(block)
+
+    return {'blocks': blocks, 'ocr_blocks': ocr_blocks, 'layout': layout, 'timings': timings, 'ocr_calls': 0}
+
+
+def store_ocr_result(block, ocr_result, cache=None, tier=None):
+    block['lang'], block['text'] = ocr_result
+    block['source'] = "ocr"
+    if tier:
+        block['tier'] = tier
+    if cache is not None and block['text']:
+        cache.put(block['image'], ocr_result)
+
+
+def ocr_stitched_blocks(blocks, backend, cache=None):
+    # All blocks in one stitched canvas (or a few, for long batches) instead
+    # of one Tesseract call each. -> number of OCR calls made
+    if not blocks:
+        return 0
+    try:
+        texts, calls = ocr_stitched([block['image'] for block in blocks], backend)
+    except Exception:
+        texts, calls = [""] * len(blocks), 1
+    for block, text in zip(blocks, texts):
+        store_ocr_result(block, classify_text(text), cache)
+    return calls
+
+
+def locked_read_missed(state, profile, language):
+    # -> the profile to reread state's OCR blocks with, when a locked
+    # language read some text but no tag; None when the read stands
+    if language is None:
+        return None
+    retry = language.retry_profile(profile, state['ocr_blocks'])
+    if retry is None or extract_tag_hits(" ".join(block['text'] for block in state['blocks'] if block['text'])):
+        return None
+    return retry
+
+
+def finish_scan(state, profile=None, matcher=None, language=None, retried=False):
+    # Tags and combinations from the block texts -> the result dict.
+    # retried: the blocks were reread with profile after a locked read missed
+    tracer = get_tracer()
+    timings = state['timings']
+    blocks = state['blocks']
+    all_detected_text = [block['text'] for block in blocks if block['text']]
+
+    combined_text = " ".join(all_detected_text)
+
+    with tracer.span('tags', timings):
+        tag_hits = extract_tag_hits(combined_text)
+        detected_tags = [hit.tag for hit in tag_hits]
+
+    if language:
+        language.observe(blocks, detected_tags, retried)
+
+    with tracer.span('match', timings):
+        combos = (matcher or get_matcher()).match(detected_tags)
+
+    counters = {
+        'ocr_calls': state['ocr_calls'],
+        'ocr_blocks': len(state['ocr_blocks']),
+        'cache_hits': sum(1 for block in blocks if block['source'] == "cache"),
+        'template_hits': sum(1 for block in blocks if block['source'] == "template"),
+        'combos': len(combos)
+    }
+    for block in blocks:
+        if block.get('tier'):
+            name = f"tier_{block['tier']}"
+            counters[name] = counters.get(name, 0) + 1
+    for name, value in counters.items():
+        tracer.count(name, value)
+
+    return {
+        'blocks': blocks,
+        'layout': state['layout'],
+        'ocr_profile': profile.name if profile else "dual",
+        'text': combined_text,
+        'tags': detected_tags,
+        'tag_confidence': {hit.tag: round(hit.confidence, 3) for hit in tag_hits},
+        'combos': combos,
+        'timings': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()},
+        'counters': counters
+    }
+
+
+def recognize_image(image, matcher=None, backend=None, config=DEFAULT_CONFIG, recognizer=None, cache=None,
+                    locator=None, screen_key=None, language=None, on_block=None, cancelled=None, placed=None,
+                    stitch=False, cascade=None):
+    # crop -> preprocess -> OCR -> tag -> match for one tag panel, no GUI involved.
+    # on_block(block) is called on this thread as each block gets its text;
+    # cancelled() is polled between blocks and raises ScanCancelled when true.
+    # placed: tag boxes the caller already found, which skips the locator.
+    # stitch: read every OCR block in one stitched Tesseract call.
+    # cascade: an OCRCascade that tries a cheap read of each block before the
+    # full preprocessing (ignored when stitching, which is one call anyway).
+    def check_cancelled():
+        if cancelled is not None and cancelled():
+            raise ScanCancelled()
+
+    def block_done(block):
+        if on_block is not None:
+            on_block(block)
+
+    profile = language.profile() if language else None
+    fixed_backend = backend
+    backend = backend or (get_backend(profile) if profile else get_backend())
+    tracer = get_tracer()
+    state = prepare_scan(image, config, recognizer, cache, locator, screen_key, placed, block_done)
+    ocr_blocks = state['ocr_blocks']
+
+    def ocr_block(block, profile, backend):
+        if cancelled is not None and cancelled():
+            return None
+        if cascade is not None:
+            with tracer.span('ocr_block', row=block['row'], col=block['col'], cascade=True):
+                text, tier, calls = cascade.read(block, backend, profile)
+            return classify_text(text), tier, calls
+        psm = profile.psm_for(block['image']) if profile and profile.constrained else None
+        with tracer.span('ocr_block', row=block['row'], col=block['col'], psm=psm):
+            return detect_language_and_text(block['image'], backend, psm), None, 1
+
+    def read_blocks(stage, profile, backend):
+        with tracer.span(stage, state['timings'], blocks=len(ocr_blocks)):
+            if stitch:
+                state['ocr_calls'] += ocr_stitched_blocks(ocr_blocks, backend, cache)
+                check_cancelled()
+                for block in ocr_blocks:
+                    block_done(block)
+            else:
+                for block, read in iter_blocks(lambda block: ocr_block(block, profile, backend), ocr_blocks):
+                    check_cancelled()
+                    ocr_result, tier, calls = read
+                    store_ocr_result(block, ocr_result, cache, tier)
+                    state['ocr_calls'] += calls
+                    block_done(block)
+
+    check_cancelled()
+    read_blocks('ocr', profile, backend)
+    retry = locked_read_missed(state, profile, language)
+    if retry is not None:
+        read_blocks('ocr_retry', retry, fixed_backend or get_backend(retry))
+        return finish_scan(state, retry, matcher, language, retried=True)
+    return finish_scan(state, profile, matcher, language)
+
+
+def recognize_batch(images, matcher=None, backend=None, config=DEFAULT_CONFIG, recognizer=None, cache=None,
+                    locator=None, language=None):
+    # Several screenshots, one stitched OCR pass: the blocks every image still
+    # needs after cache and templates are read together, so the per-call
+    # Tesseract overhead is shared by the whole batch. -> one result per image
+    profile = language.profile() if language else None
+    fixed_backend = backend
+    backend = backend or (get_backend(profile) if profile else get_backend())
+    tracer = get_tracer()
+    states = [prepare_scan(image, config, recognizer, cache, locator) for image in images]
+    ocr_blocks = [block for state in states for block in state['ocr_blocks']]
+    ocr_timings = {}
+    with tracer.span('ocr', ocr_timings, blocks=len(ocr_blocks), images=len(images)):
+        calls = ocr_stitched_blocks(ocr_blocks, backend, cache)
+    # Images the locked read found no tags in are reread together
+    retries = [locked_read_missed(state, profile, language) for state in states]
+    missed = [block for state, retry in zip(states, retries) if retry for block in state['ocr_blocks']]
+    if missed:
+        retry = next(retry for retry in retries if retry)
+        with tracer.span('ocr_retry', ocr_timings, blocks=len(missed)):
+            calls += ocr_stitched_blocks(missed, fixed_backend or get_backend(retry), cache)
+    # The pass is charged once, to the first image that sent it blocks, so
+    # ocr_calls still sums to the real total; every image also reports the
+    # size of the pass it shared as batch_ocr_calls
+    owner = next((state for state in states if state['ocr_blocks']), None)
+    if owner is not None:
+        owner['ocr_calls'] = calls
+    results = []
+    for state, retry in zip(states, retries):
+        state['timings'].update(ocr_timings)
+        result = finish_scan(state, retry or profile, matcher, language, retried=retry is not None)
+        result['counters']['batch_ocr_calls'] = calls
+        results.append(result)
+    return results
+
+
+def result_summary(result):
+    # The JSON-safe part of a recognize_image result: no block images or operator ids
+    return {
+        'blocks': [{'row': b['row'], 'col': b['col'], 'lang': b['lang'], 'text': b['text'], 'source': b['source'],
+                    'tier': b.get('tier')} for b in result['blocks']],
+        'layout': result['layout'],
+        'ocr_profile': result['ocr_profile'],
+        'tags': result['tags'],
+        'tag_confidence': result['tag_confidence'],
+        'combos': [{
+            'tags': combo['tags'],
+            'lowest_rarity': combo['lowest_rarity'],
+            'operators': [{'name': op['name'], 'rarity': op['rarity']} for op in combo['operators']]
+        } for combo in result['combos']]
+    }
+
+
+def recognize_slots(image, on_slot=None, cancelled=None, max_workers=MAX_SLOT_WORKERS, panels=None, **scan_kwargs):
+    # One full-screen capture -> every open slot's tag panel. Panels are found
+    # once on the whole frame, then each slot runs recognize_image on its crop
+    # side by side; their OCR calls all queue on the shared engine pool.
+    # on_slot(slot) is called on this thread as each slot finishes; panels
+    # from an earlier find_tag_panels call skip the search.
+    scan_kwargs.pop('locator', None)
+    scan_kwargs.pop('screen_key', None)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    tracer = get_tracer()
+    timings = {}
+    if panels is None:
+        with tracer.span('locate_slots', timings):
+            panels = find_tag_panels(cv2.cvtColor(numpy.asarray(image), cv2.COLOR_RGB2GRAY))
+
+    def scan_slot(index):
+        panel, placed = panels[index]
+        with tracer.span('slot', slot=index):
+            result = recognize_image(image.crop(panel), cancelled=cancelled, placed=placed, **scan_kwargs)
+        return {'slot': index, 'box': panel, 'result': result}
+
+    slots = []
+    with tracer.span('slots', timings, slots=len(panels)):
+        if panels:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(panels)), thread_name_prefix="slot") as pool:
+                futures = [pool.submit(scan_slot, index) for index in range(len(panels))]
+                try:
+                    for future in as_completed(futures):
+                        slot = future.result()
+                        slots.append(slot)
+                        if on_slot is not None:
+                            on_slot(slot)
+                finally:
+                    for future in futures:
+                        future.cancel()
+    slots.sort(key=lambda slot: slot['slot'])
+
+    counters = {'slots': len(slots)}
+    for slot in slots:
+        for name, value in slot['result']['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        'slots': slots,
+        'timings': {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()},
+        'counters': counters
+    }
@@ -0,0 +1,156 @@
+import argparse
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import cv2
+import numpy
+from PIL import Image
+
+
+@dataclass
+class PreprocessConfig:
+    scale: int = 2
+    contrast: float = 1.5
+    threshold_block_size: int = 11
+    threshold_c: int = 2
+    crop_padding: int = -10
+    interpolation: int = cv2.INTER_LANCZOS4
+
+
+DEFAULT_CONFIG = PreprocessConfig()
+
+
+def to_rgb_array(image):
+    if isinstance(image, numpy.ndarray):
+        return image
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return numpy.asarray(image)
+
+
+@lru_cache(maxsize=512)
+def contrast_lut(mean, factor):
+    # Same curve as PIL's ImageEnhance.Contrast for an image whose mean gray
+    # is `mean`, applied with a lookup table
+    values = mean + factor * (numpy.arange(256, dtype=numpy.float32) - mean)
+    return numpy.clip(values + 0.5, 0, 255).astype(numpy.uint8)
+
+
+class PreparedFrame:
+    # Grayscale and threshold run once over the whole frame; blocks are cut
+    # out of them as array views. Contrast pivots on each block's own mean,
+    # like the per-block ImageEnhance path, and only the cropped tag regions
+    # are upscaled, so background and the empty grid cell are never resized.
+    def __init__(self, image, config=DEFAULT_CONFIG):
+        self.config = config
+        rgb = to_rgb_array(image)
+        self.gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY) if rgb.ndim == 3 else rgb
+        self.thresh = cv2.adaptiveThreshold(self.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
+                                            config.threshold_block_size, config.threshold_c)
+
+    def crop_box(self, box):
+        # Largest contour inside the block, shrunk by crop_padding, in frame coordinates
+        x1, y1, x2, y2 = box
+        contours, _ = cv2.findContours(self.thresh[y1:y2, x1:x2], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return box
+        x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+        padding = self.config.crop_padding
+        block_w, block_h = x2 - x1, y2 - y1
+        x = max(0, x - padding)
+        y = max(0, y - padding)
+        w = min(block_w - x, w + 2 * padding)
+        h = min(block_h - y, h + 2 * padding)
+        if w <= 0 or h <= 0:
+            return box
+        return (x1 + x, y1 + y, x1 + x + w, y1 + y + h)
+
+    def block(self, box, refine=True):
+        # refine=False for boxes that already hug the tag, e.g. from the localizer
+        x1, y1, x2, y2 = self.crop_box(box) if refine else box
+        view = self.gray[y1:y2, x1:x2]
+        scale = self.config.scale
+        if scale != 1:
+            view = cv2.resize(view, ((x2 - x1) * scale, (y2 - y1) * scale), interpolation=self.config.interpolation)
+        # Upscale first, then stretch about the block's mean, in the legacy order
+        mean = int(view.mean() + 0.5) if view.size else 0
+        return cv2.LUT(view, contrast_lut(mean, self.config.contrast))
+
+    def native_block(self, box):
+        # The same crop at capture resolution and without the contrast boost
+        x1, y1, x2, y2 = box
+        return numpy.ascontiguousarray(self.gray[y1:y2, x1:x2])
+
+
+def prepare_blocks(image, boxes, config=DEFAULT_CONFIG):
+    frame = PreparedFrame(image, config)
+    return [frame.block(box) for box in boxes]
+
+
+def benchmark(images, repeat=20, config=DEFAULT_CONFIG):
+    from pipeline import auto_crop_image_adaptive, preprocess_image_for_ocr, split_blocks
+
+    def legacy(image):
+        return [preprocess_image_for_ocr(auto_crop_image_adaptive(image.crop(box)))
+                for _, _, box in split_blocks(*image.size)]
+
+    def vectorized(image):
+        return prepare_blocks(image, [box for _, _, box in split_blocks(*image.size)], config)
+
+    report = {}
+    for name, func in (("legacy", legacy), ("vectorized", vectorized)):
+        samples = []
+        for image in images:
+            func(image)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(image)
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        report[name] = {
+            'p50_ms': round(statistics.median(samples), 3),
+            'p95_ms': round(samples[int(len(samples) * 0.95) - 1], 3),
+            'mean_ms': round(statistics.fmean(samples), 3)
+        }
+    report['speedup'] = round(report['legacy']['p50_ms'] / report['vectorized']['p50_ms'], 2)
+    return report
+
+
+def synthetic_panel(width=900, height=240, seed=0):
+    rng = numpy.random.default_rng(seed)
+    frame = numpy.full((height, width, 3), 40, dtype=numpy.uint8)
+    frame += rng.integers(0, 12, frame.shape, dtype=numpy.uint8)
+    block_w, block_h = width // 3, height // 2
+    for row in range(2):
+        for col in range(3):
+            if (row, col) == (1, 2):
+                continue
+            x, y = col * block_w + 15, row * block_h + 15
+            cv2.rectangle(frame, (x, y), (x + block_w - 30, y + block_h - 30), (225, 225, 225), 2)
+            cv2.putText(frame, "Tag", (x + 30, y + block_h // 2), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (230, 230, 230), 2)
+    return Image.fromarray(frame)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python preprocess.py", description="Compare per-block and whole-frame preprocessing.")
+    parser.add_argument('images', nargs='*', help="tag panel screenshots (default: a synthetic panel)")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scale', type=int, default=DEFAULT_CONFIG.scale)
+    parser.add_argument('--contrast', type=float, default=DEFAULT_CONFIG.contrast)
+    args = parser.parse_args(argv)
+
+    images = [Image.open(path).convert('RGB') for path in args.images] or [synthetic_panel()]
+    config = PreprocessConfig(scale=args.scale, contrast=args.contrast)
+    report = benchmark(images, repeat=args.repeat, config=config)
+    for name in ("legacy", "vectorized"):
+        stats = report[name]
+        print(f"{name:>10}: p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms  mean {stats['mean_ms']:.2f} ms")
+    print(f"   speedup: {report['speedup']}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
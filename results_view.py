@@ -0,0 +1,253 @@
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSize, Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QImage, QPixmap
+from PyQt5.QtWidgets import QAbstractItemView, QLabel, QListView, QStyle, QStyledItemDelegate, QVBoxLayout, QWidget
+
+RARITY_COLOR = {
+    1: '#FFFFFF',
+    2: '#9E9E1E',
+    3: '#0398D0',
+    4: '#CFB6CF',
+    5: '#FFE916',
+    6: "#FF8400"
+}
+LABEL_COLOR = '#CCCCCC'
+SELECTED_COLOR = '#555555'
+ITEM_MARGIN = 10
+LINE_GAP = 4
+GroupRole = Qt.UserRole
+MAX_CACHED_LAYOUTS = 512
+AVATAR_GAP = 4
+DEFAULT_PIXMAP_BUDGET = 8 * 1024 * 1024
+
+
+def group_key(group):
+    return tuple(group['tags'])
+
+
+def group_content(group):
+    return (group['lowest_rarity'], tuple((op['name'], op['rarity']) for op in group['operators']))
+
+
+class AvatarPixmapCache:
+    # LRU of scaled portrait pixmaps bounded by their pixel bytes. Misses are
+    # built from the memory-mapped atlas tile, so nothing touches the disk.
+    def __init__(self, atlas, max_bytes=DEFAULT_PIXMAP_BUDGET):
+        self.atlas = atlas
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._pixmaps = OrderedDict()
+
+    def __contains__(self, op_id):
+        return op_id in self.atlas
+
+    def pixmap(self, op_id, size):
+        key = (op_id, size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        tile = self.atlas.tile(op_id)
+        if tile is None:
+            return None
+        edge = tile.shape[0]
+        image = QImage(tile.tobytes(), edge, edge, edge * 4, QImage.Format_RGBA8888)
+        pixmap = QPixmap.fromImage(image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self._pixmaps[key] = pixmap
+        self.bytes += size * size * 4
+        while self.bytes > self.max_bytes and len(self._pixmaps) > 1:
+            (_, old_size), _ = self._pixmaps.popitem(last=False)
+            self.bytes -= old_size * old_size * 4
+        return pixmap
+
+    def clear(self):
+        self._pixmaps.clear()
+        self.bytes = 0
+
+
+class OperatorGroupModel(QAbstractListModel):
+    # One row per tag combination. set_groups diffs the new scan against the
+    # rows already shown, so a repeated or slightly changed result only
+    # touches the rows that differ instead of rebuilding the whole list.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._groups = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._groups)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._groups):
+            return None
+        group = self._groups[index.row()]
+        if role == GroupRole:
+            return group
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return f"Tags: {', '.join(group['tags'])}\nOperator: {', '.join(op['name'] for op in group['operators'])}"
+        return None
+
+    def groups(self):
+        return list(self._groups)
+
+    def set_groups(self, groups):
+        groups = list(groups)
+        old_keys = [group_key(group) for group in self._groups]
+        new_keys = [group_key(group) for group in groups]
+        opcodes = SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+        # Apply from the end so earlier row numbers stay valid
+        for tag, old_start, old_end, new_start, new_end in reversed(opcodes):
+            if tag == 'equal':
+                changed = [offset for offset in range(old_end - old_start)
+                           if group_content(self._groups[old_start + offset]) != group_content(groups[new_start + offset])]
+                for offset in changed:
+                    self._groups[old_start + offset] = groups[new_start + offset]
+                if changed:
+                    self.dataChanged.emit(self.index(old_start + changed[0]), self.index(old_start + changed[-1]))
+                continue
+            if old_end > old_start:
+                self.beginRemoveRows(QModelIndex(), old_start, old_end - 1)
+                del self._groups[old_start:old_end]
+                self.endRemoveRows()
+            if new_end > new_start:
+                self.beginInsertRows(QModelIndex(), old_start, old_start + new_end - new_start - 1)
+                self._groups[old_start:old_start] = groups[new_start:new_end]
+                self.endInsertRows()
+
+    def clear(self):
+        self.set_groups([])
+
+
+class OperatorGroupDelegate(QStyledItemDelegate):
+    # Paints the tag line and rarity-coloured operator names straight onto the
+    # view. Word-wrapped layouts are cached per group content and width, so
+    # sizeHint and paint do no text measuring for rows already laid out.
+    def __init__(self, parent=None, avatars=None):
+        super().__init__(parent)
+        self._layouts = {}
+        self.avatars = avatars
+
+    def set_avatars(self, avatars):
+        self.avatars = avatars
+        self._layouts.clear()
+
+    def _bold(self, font):
+        font = QFont(font)
+        font.setBold(True)
+        return font
+
+    def _layout(self, group, font, width):
+        key = (group_key(group), group_content(group), font.key(), width, self.avatars is not None)
+        layout = self._layouts.get(key)
+        if layout is not None:
+            return layout
+        if len(self._layouts) >= MAX_CACHED_LAYOUTS:
+            self._layouts.clear()
+
+        metrics = QFontMetrics(font)
+        line_height = metrics.height()
+        runs = []
+        x = y = 0
+
+        def place(text, color, avatar=None):
+            nonlocal x, y
+            icon = line_height + AVATAR_GAP if avatar else 0
+            advance = icon + metrics.horizontalAdvance(text)
+            if x and x + advance > width:
+                x, y = 0, y + line_height
+            runs.append((x, y, text, color, avatar))
+            x += advance
+
+        for word in f"Tags: {', '.join(group['tags'])}".split(' '):
+            place(word + ' ', LABEL_COLOR)
+        x, y = 0, y + line_height + LINE_GAP
+        place("Operator: ", LABEL_COLOR)
+        operators = group['operators']
+        for i, op in enumerate(operators):
+            avatar = op.get('id') if self.avatars is not None and op.get('id') in self.avatars else None
+            place(op['name'] + (", " if i < len(operators) - 1 else ""), RARITY_COLOR.get(op['rarity'], "#FFFFFF"), avatar)
+        layout = (runs, y + line_height, metrics.ascent())
+        self._layouts[key] = layout
+        return layout
+
+    def _text_width(self, option):
+        view = self.parent()
+        width = view.viewport().width() if isinstance(view, QAbstractItemView) else option.rect.width()
+        return max(50, width - 2 * ITEM_MARGIN)
+
+    def sizeHint(self, option, index):
+        group = index.data(GroupRole)
+        if group is None:
+            return super().sizeHint(option, index)
+        width = self._text_width(option)
+        _, height, _ = self._layout(group, self._bold(option.font), width)
+        return QSize(width + 2 * ITEM_MARGIN, height + 2 * ITEM_MARGIN)
+
+    def paint(self, painter, option, index):
+        group = index.data(GroupRole)
+        if group is None:
+            return super().paint(painter, option, index)
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(SELECTED_COLOR))
+            painter.drawRoundedRect(option.rect.adjusted(2, 2, -2, -2), 4, 4)
+        font = self._bold(option.font)
+        painter.setFont(font)
+        runs, _, ascent = self._layout(group, font, self._text_width(option))
+        line_height = QFontMetrics(font).height()
+        left, top = option.rect.left() + ITEM_MARGIN, option.rect.top() + ITEM_MARGIN
+        for x, y, text, color, avatar in runs:
+            if avatar:
+                pixmap = self.avatars.pixmap(avatar, line_height)
+                if pixmap is not None:
+                    painter.drawPixmap(left + x, top + y, pixmap)
+                x += line_height + AVATAR_GAP
+            painter.setPen(QColor(color))
+            painter.drawText(left + x, top + y + ascent, text)
+        painter.restore()
+
+
+class OperatorGroupView(QListView):
+    # Only visible rows are painted; rows are laid out in batches and
+    # re-laid out when the viewport width changes.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setModel(OperatorGroupModel(self))
+        self.setItemDelegate(OperatorGroupDelegate(self))
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(16)
+        self.setResizeMode(QListView.Adjust)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(15)
+
+    def set_groups(self, groups):
+        self.model().set_groups(groups)
+
+    def set_avatars(self, avatars):
+        # Portraits change every row's width, so lay everything out again
+        self.itemDelegate().set_avatars(avatars)
+        self.scheduleDelayedItemsLayout()
+        self.viewport().update()
+
+
+class SlotResultView(QWidget):
+    # One recruitment slot of a full-screen scan: its tags over its combinations
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.tags_label = QLabel()
+        self.tags_label.setWordWrap(True)
+        layout.addWidget(self.tags_label)
+        self.operators_list = OperatorGroupView()
+        layout.addWidget(self.operators_list)
+
+    def set_result(self, tags_text, groups):
+        self.tags_label.setText(tags_text)
+        self.operators_list.set_groups(groups)
+
+    def set_avatars(self, avatars):
+        self.operators_list.set_avatars(avatars)
@@ -0,0 +1,147 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+MAX_PENDING_SCANS = 1
+
+
+class ScanSignals(QObject):
+    # Payloads are (scan id, ...); receivers ignore ids they no longer want
+    block_done = pyqtSignal(int, object)
+    slot_done = pyqtSignal(int, object)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class ScanTask(QRunnable):
+    # Runs recognize_image off the GUI thread. After every block it re-runs
+    # tag extraction and matching on the text read so far and emits the
+    # partial result, so tags and combinations fill in as blocks finish.
+    def __init__(self, scan_id, screenshot, scan_kwargs, signals, context=None):
+        super().__init__()
+        self.setAutoDelete(True)
+        self.scan_id = scan_id
+        self.screenshot = screenshot
+        self.scan_kwargs = scan_kwargs
+        self.signals = signals
+        self.context = context
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        from matcher import get_matcher
+        from pipeline import ScanCancelled, recognize_image
+        from tags import extract_tag_hits
+
+        matcher = self.scan_kwargs.get('matcher') or get_matcher()
+        done = []
+
+        def on_block(block):
+            done.append(block)
+            ordered = sorted(done, key=lambda b: (b['row'], b['col']))
+            hits = extract_tag_hits(" ".join(b['text'] for b in ordered if b['text']))
+            tags = [hit.tag for hit in hits]
+            self.signals.block_done.emit(self.scan_id, {
+                'block': block,
+                'blocks_done': len(done),
+                'tags': tags,
+                'tag_confidence': {hit.tag: round(hit.confidence, 3) for hit in hits},
+                'combos': matcher.match(tags)
+            })
+
+        start = time.perf_counter()
+        try:
+            result = recognize_image(self.screenshot, on_block=on_block, cancelled=self.cancel_event.is_set,
+                                     **self.scan_kwargs)
+        except ScanCancelled:
+            self.signals.cancelled.emit(self.scan_id)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.scan_id, str(e))
+            return
+        result['scan_seconds'] = time.perf_counter() - start
+        self.signals.finished.emit(self.scan_id, (self.screenshot, result, self.context))
+
+
+class SlotScanTask(ScanTask):
+    # Full-screen variant: finds every slot's tag panel in the one capture
+    # and scans them concurrently, emitting each slot as it completes.
+    def run(self):
+        from pipeline import ScanCancelled, recognize_slots
+
+        start = time.perf_counter()
+        try:
+            result = recognize_slots(self.screenshot, on_slot=lambda slot: self.signals.slot_done.emit(self.scan_id, slot),
+                                     cancelled=self.cancel_event.is_set, **self.scan_kwargs)
+        except ScanCancelled:
+            self.signals.cancelled.emit(self.scan_id)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.scan_id, str(e))
+            return
+        result['scan_seconds'] = time.perf_counter() - start
+        self.signals.finished.emit(self.scan_id, (self.screenshot, result, self.context))
+
+
+class ScanController(QObject):
+    # One scan runs at a time (its blocks are already OCR'd in parallel).
+    # Submitting while busy cancels the running scan and parks the new frame
+    # in a bounded queue; older parked frames are dropped as stale.
+    def __init__(self, parent=None, max_pending=MAX_PENDING_SCANS):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = ScanSignals(self)
+        self.signals.finished.connect(self._on_done)
+        self.signals.failed.connect(self._on_done)
+        self.signals.cancelled.connect(self._on_done)
+        self._pending = deque(maxlen=max_pending)
+        self._running = None
+        self._next_id = 0
+        self.dropped = 0
+
+    def submit(self, screenshot, scan_kwargs, context=None, task_class=ScanTask):
+        self._next_id += 1
+        task = task_class(self._next_id, screenshot, scan_kwargs, self.signals, context)
+        if self._running is None:
+            self._start(task)
+        else:
+            self._running.cancel()
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(task)
+        return task.scan_id
+
+    def cancel_all(self):
+        self.dropped += len(self._pending)
+        self._pending.clear()
+        if self._running is not None:
+            self._running.cancel()
+
+    def latest_id(self):
+        return self._next_id
+
+    def busy(self):
+        return self._running is not None
+
+    def _start(self, task):
+        self._running = task
+        self.pool.start(task)
+
+    def _on_done(self, scan_id, *_):
+        if self._running is None or scan_id != self._running.scan_id:
+            return
+        self._running = None
+        if self._pending:
+            self._start(self._pending.popleft())
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
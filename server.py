@@ -0,0 +1,330 @@
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy
+from PIL import Image
+
+import ocr_backend
+import pipeline
+from instrument import get_tracer, percentile
+from localize import TagBoxLocator
+from matcher import DEFAULT_CSV_PATH, get_matcher
+from ocr_cache import OCRCache
+from ocr_cascade import OCRCascade
+from ocr_profile import PROFILE_NAMES, LanguageLock
+from template_ocr import TemplateRecognizer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 8
+MAX_BODY_BYTES = 32 * 1024 * 1024
+LATENCY_WINDOW = 1000
+THROUGHPUT_WINDOW_S = 60.0
+# Language locks kept for the most recently seen clients; the rest relearn
+MAX_CLIENTS = 256
+RAW_MODES = {'gray': ('L', 1), 'rgb': ('RGB', 3), 'rgba': ('RGBA', 4), 'bgra': ('RGBA', 4)}
+
+
+class Overloaded(Exception):
+    pass
+
+
+def decode_frame(body, query):
+    # Encoded images (PNG, JPEG, ...) as they are; raw pixels need
+    # ?width=&height=&format=gray|rgb|rgba|bgra
+    if 'width' not in query:
+        image = Image.open(io.BytesIO(body))
+        image.load()
+        return image
+    width, height = int(query['width']), int(query['height'])
+    fmt = query.get('format', 'rgb')
+    if fmt not in RAW_MODES:
+        raise ValueError(f"Unknown raw format {fmt!r}, expected one of {', '.join(RAW_MODES)}")
+    mode, channels = RAW_MODES[fmt]
+    if len(body) != width * height * channels:
+        raise ValueError(f"Expected {width * height * channels} bytes for a {width}x{height} {fmt} frame, got {len(body)}")
+    pixels = numpy.frombuffer(body, dtype=numpy.uint8).reshape((height, width, channels) if channels > 1 else (height, width))
+    if fmt == 'bgra':
+        pixels = pixels[:, :, [2, 1, 0, 3]]
+    return Image.fromarray(pixels, mode)
+
+
+class ServiceStats:
+    # Request counters plus a sliding window of recent latencies for /stats
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {'accepted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        self.in_flight = 0
+        self.queued = 0
+        self._recent = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counts[name] += value
+
+    def waiting(self, delta):
+        with self._lock:
+            self.queued += delta
+
+    def running(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    def record(self, queue_ms, scan_ms, total_ms):
+        with self._lock:
+            self.counts['completed'] += 1
+            self._recent.append((time.time(), queue_ms, scan_ms, total_ms))
+
+    def snapshot(self):
+        with self._lock:
+            recent = list(self._recent)
+            counts = dict(self.counts)
+            in_flight, queued = self.in_flight, self.queued
+        now = time.time()
+        window = [sample for sample in recent if now - sample[0] <= THROUGHPUT_WINDOW_S]
+        span = min(THROUGHPUT_WINDOW_S, now - self.started) or 1.0
+        latency = {}
+        for name, column in (('queue', 1), ('scan', 2), ('total', 3)):
+            samples = [sample[column] for sample in recent]
+            latency[name] = {'p50_ms': percentile(samples, 50), 'p95_ms': percentile(samples, 95),
+                             'p99_ms': percentile(samples, 99)}
+        return {
+            'uptime_s': round(now - self.started, 1),
+            'requests': counts,
+            'in_flight': in_flight,
+            'queued': queued,
+            'throughput_per_s': round(len(window) / span, 3),
+            'latency': latency,
+            'latency_samples': len(recent)
+        }
+
+
+class RecognitionService:
+    # One warm context shared by every request: roster, answer table, OCR
+    # engines, template recognizer and cache are loaded once. At most
+    # `workers` scans run at a time and `queue` more may wait; beyond that a
+    # request is refused straight away so callers back off instead of piling up.
+    def __init__(self, workers=ocr_backend.DEFAULT_POOL_SIZE, queue=DEFAULT_QUEUE, csv_path=DEFAULT_CSV_PATH,
+                 use_templates=False, cache_db=None, use_grid=False, ocr_profile="auto", stitch=False,
+                 use_cascade=False):
+        self.workers = max(1, workers)
+        self.queue = max(0, queue)
+        self.matcher = get_matcher(csv_path)
+        self.recognizer = TemplateRecognizer() if use_templates else None
+        self.cache = OCRCache(db_path=cache_db)
+        self.locator = None if use_grid else TagBoxLocator()
+        self.ocr_profile = ocr_profile
+        self.stitch = stitch
+        self.cascade = OCRCascade() if use_cascade else None
+        self.stats = ServiceStats()
+        self._admission = threading.BoundedSemaphore(self.workers + self.queue)
+        self._running = threading.BoundedSemaphore(self.workers)
+        self._languages = OrderedDict()
+        self._languages_lock = threading.Lock()
+
+    def warm_up(self):
+        lock = self.language()
+        ocr_backend.get_backend(lock.profile()).warm_up()
+        ocr_backend.warm_up_ocr(lock.profile())
+
+    def language(self, client=""):
+        # Each client (emulator instance) locks to its own client language.
+        # Client ids come straight from the query string, so only the
+        # MAX_CLIENTS most recently seen keep their lock.
+        with self._languages_lock:
+            lock = self._languages.get(client)
+            if lock is None:
+                lock = self._languages[client] = LanguageLock(self.ocr_profile)
+                if len(self._languages) > MAX_CLIENTS:
+                    self._languages.popitem(last=False)
+            else:
+                self._languages.move_to_end(client)
+            return lock
+
+    def recognize(self, image, client="", slots=False):
+        if not self._admission.acquire(blocking=False):
+            self.stats.add('rejected')
+            raise Overloaded()
+        self.stats.add('accepted')
+        start = time.perf_counter()
+        try:
+            self.stats.waiting(1)
+            self._running.acquire()
+            self.stats.waiting(-1)
+            self.stats.running(1)
+            queue_ms = (time.perf_counter() - start) * 1000
+            try:
+                kwargs = {'matcher': self.matcher, 'recognizer': self.recognizer, 'cache': self.cache,
+                          'locator': self.locator, 'language': self.language(client), 'stitch': self.stitch,
+                          'cascade': self.cascade}
+                if slots:
+                    result = pipeline.recognize_slots(image, **kwargs)
+                    response = {'slots': [{'slot': slot['slot'], 'box': list(slot['box']),
+                                           **pipeline.result_summary(slot['result'])} for slot in result['slots']]}
+                else:
+                    result = pipeline.recognize_image(image, **kwargs)
+                    response = pipeline.result_summary(result)
+            except Exception:
+                self.stats.add('failed')
+                raise
+            finally:
+                self.stats.running(-1)
+                self._running.release()
+        finally:
+            self._admission.release()
+        total_ms = (time.perf_counter() - start) * 1000
+        self.stats.record(queue_ms, total_ms - queue_ms, total_ms)
+        response['timings'] = dict(result['timings'], queue=round(queue_ms, 3), total=round(total_ms, 3))
+        return response
+
+    def stats_snapshot(self):
+        snapshot = self.stats.snapshot()
+        backend = ocr_backend.get_backend(self.language().profile()).name
+        with self._languages_lock:
+            languages = {client or "default": lock.locked for client, lock in self._languages.items()}
+        snapshot.update({'workers': self.workers, 'queue': self.queue, 'cache': self.cache.stats(),
+                         'cascade': self.cascade.stats() if self.cascade else None,
+                         'ocr_backend': backend, 'languages': languages})
+        return snapshot
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # POST /recognize  body: PNG/JPEG bytes or raw pixels (see decode_frame);
+    #                  ?slots=1 scans every tag panel of a full-screen frame,
+    #                  ?client=<name> keeps a separate language lock per caller
+    # GET  /stats      counters, throughput and latency percentiles
+    # GET  /health     200 once the engines are warm
+    server_version = "ArknightsRecruitOCR/1.0"
+    service = None
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/stats':
+            self.send_json(200, self.service.stats_snapshot())
+        elif path == '/health':
+            self.send_json(200, {'status': "ok"})
+        else:
+            self.send_json(404, {'error': f"Unknown path {path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/recognize':
+            self.send_json(404, {'error': f"Unknown path {url.path}"})
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if not 0 < length <= MAX_BODY_BYTES:
+            self.send_json(413 if length else 400, {'error': f"Body must be 1 to {MAX_BODY_BYTES} bytes"})
+            return
+        body = self.rfile.read(length)
+        try:
+            image = decode_frame(body, query)
+        except Exception as e:
+            self.send_json(400, {'error': f"Could not decode frame: {e}"})
+            return
+        try:
+            response = self.service.recognize(image, client=query.get('client', ""),
+                                              slots=query.get('slots') in ('1', 'true'))
+        except Overloaded:
+            self.send_json(503, {'error': "Server busy, retry later"}, {'Retry-After': "1"})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    handler = type('BoundRequestHandler', (RequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def send_image(path, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", client="", timeout=60):
+    # Minimal client: POST one screenshot file, return the decoded JSON reply
+    with open(path, 'rb') as f:
+        body = f.read()
+    query = "?" + urlencode({'client': client}) if client else ""
+    request = urllib.request.Request(f"{url}/recognize{query}", data=body, method='POST',
+                                     headers={'Content-Type': 'application/octet-stream'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m server", description="Serve recruitment tag recognition over localhost HTTP with warm OCR engines.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="interface to bind (default: localhost only)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('-j', '--workers', type=int, default=ocr_backend.DEFAULT_POOL_SIZE, help="scans run at once")
+    parser.add_argument('--queue', type=int, default=DEFAULT_QUEUE, help="scans allowed to wait before requests get 503")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="roster CSV to match against")
+    parser.add_argument('--templates', action='store_true', help="classify blocks against tag templates first, OCR only low-confidence ones")
+    parser.add_argument('--grid', action='store_true', help="split the panel into the fixed 3x2 grid instead of detecting tag boxes")
+    parser.add_argument('--cache-db', default=None, help="SQLite file to persist OCR results across runs")
+    parser.add_argument('--ocr-backend', choices=ocr_backend.BACKEND_NAMES, default="auto", help="OCR engine (default: tesserocr if installed, else pytesseract)")
+    parser.add_argument('--ocr-profile', choices=PROFILE_NAMES, default="auto", help="OCR language profile (default: lock each client to its language after the first hit)")
+    parser.add_argument('--stitch', action='store_true', help="OCR each panel's blocks in one stitched call")
+    parser.add_argument('--cascade', action='store_true', help="read each block cheaply first and escalate only unclear ones (fast tier needs tesserocr and a locked language)")
+    parser.add_argument('--trace', default=None, help="write a Chrome trace of every span to this file on exit")
+    parser.add_argument('--send', nargs='+', metavar='IMAGE', help="act as a client: post these screenshots to a running server and print the replies")
+    args = parser.parse_args(argv)
+
+    url = f"http://{args.host}:{args.port}"
+    if args.send:
+        for path in args.send:
+            print(json.dumps({'path': path, **send_image(path, url)}, ensure_ascii=False))
+        return 0
+
+    ocr_backend.set_backend_name(args.ocr_backend)
+    get_tracer().enabled = bool(args.trace)
+    service = RecognitionService(workers=args.workers, queue=args.queue, csv_path=args.csv,
+                                 use_templates=args.templates, cache_db=args.cache_db, use_grid=args.grid,
+                                 ocr_profile=args.ocr_profile, stitch=args.stitch,
+                                 use_cascade=args.cascade)
+    try:
+        service.warm_up()
+    except Exception:
+        print("Tesseract OCR not found! Please install it with Chinese language support.", file=sys.stderr)
+        return 1
+    server = create_server(service, args.host, args.port)
+    print(f"Serving on {url} with {service.workers} workers and a queue of {service.queue}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.trace:
+            print(f"Trace written to {get_tracer().export(args.trace)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import cv2
+import numpy
+
+from ocr_profile import PSM_SINGLE_BLOCK
+
+MIN_LINE_HEIGHT = 32
+MAX_LINE_HEIGHT = 128
+# Blank rows between blocks, as a share of the line height; enough for
+# Tesseract's layout analysis to keep every block on its own text line
+SEPARATOR_RATIO = 0.75
+CANVAS_MARGIN = 16
+MAX_STITCH_BLOCKS = 32
+
+
+def dark_on_light(gray):
+    # Tag crops are light text on a dark box; Tesseract wants the reverse
+    border = numpy.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    return 255 - gray if numpy.median(border) < 128 else gray
+
+
+def normalize_block(image, line_height):
+    gray = numpy.asarray(image.convert('L')) if not isinstance(image, numpy.ndarray) else image
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    gray = dark_on_light(gray)
+    height, width = gray.shape
+    if height == line_height:
+        return gray
+    width = max(1, round(width * line_height / height))
+    interpolation = cv2.INTER_AREA if height > line_height else cv2.INTER_CUBIC
+    return cv2.resize(gray, (width, line_height), interpolation=interpolation)
+
+
+def stitch_blocks(images):
+    # -> (canvas, bands): blocks stacked top to bottom at one common height on
+    # a white canvas, with bands[i] the (top, bottom) rows of block i
+    heights = [image.shape[0] if isinstance(image, numpy.ndarray) else image.size[1] for image in images]
+    line_height = int(numpy.clip(numpy.median(heights), MIN_LINE_HEIGHT, MAX_LINE_HEIGHT))
+    strips = [normalize_block(image, line_height) for image in images]
+    gap = int(line_height * SEPARATOR_RATIO)
+    width = max(strip.shape[1] for strip in strips) + 2 * CANVAS_MARGIN
+    height = 2 * CANVAS_MARGIN + len(strips) * line_height + (len(strips) - 1) * gap
+    canvas = numpy.full((height, width), 255, dtype=numpy.uint8)
+    bands = []
+    top = CANVAS_MARGIN
+    for strip in strips:
+        canvas[top:top + line_height, CANVAS_MARGIN:CANVAS_MARGIN + strip.shape[1]] = strip
+        bands.append((top, top + line_height))
+        top += line_height + gap
+    return canvas, bands
+
+
+def assign_words(words, bands):
+    # Each word goes to the band its vertical centre falls in, widened by half
+    # a separator either side; words are kept in the order Tesseract read them
+    texts = [[] for _ in bands]
+    reach = (bands[1][0] - bands[0][1]) / 2 if len(bands) > 1 else CANVAS_MARGIN
+    for word in words:
+        _, y1, _, y2 = word['box']
+        center = (y1 + y2) / 2
+        for i, (top, bottom) in enumerate(bands):
+            if top - reach <= center < bottom + reach:
+                texts[i].append(word['text'])
+                break
+    return [" ".join(parts) for parts in texts]
+
+
+def ocr_stitched(images, backend, psm=PSM_SINGLE_BLOCK, max_blocks=MAX_STITCH_BLOCKS):
+    # -> (text per image, OCR calls made). One image_to_data call covers up to
+    # max_blocks blocks, so engine setup and layout analysis are paid once
+    texts = []
+    calls = 0
+    for start in range(0, len(images), max_blocks):
+        canvas, bands = stitch_blocks(images[start:start + max_blocks])
+        texts.extend(assign_words(backend.image_to_data(canvas, psm=psm), bands))
+        calls += 1
+    return texts, calls
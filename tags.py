@@ -0,0 +1,249 @@
+import re
+
+arknights_tags_by_category = {
+    "Class": {
+        "Guard": "近卫干员",
+        "Sniper": "狙击干员",
+        "Defender": "重装干员",
+        "Medic": "医疗干员",
+        "Supporter": "辅助干员",
+        "Caster": "术师干员",
+        "Specialist": "特种干员",
+        "Vanguard": "先锋干员"
+    },
+    "Position": {
+        "Melee": "近战位",
+        "Ranged": "远程位"
+    },
+    "Qualification": {
+        "Starter": "新手",
+        "Senior Operator": "资深干员",
+        "Top Operator": "高级资深干员"
+    },
+    "Affix": {
+        "Crowd Control": "控场",
+        "Nuker": "爆发",
+        "Healing": "治疗",
+        "Support": "支援",
+        "DP-Recovery": "费用回复",
+        "DPS": "输出",
+        "Survival": "生存",
+        "AoE": "群攻",
+        "Defense": "防护",
+        "Slow": "减速",
+        "Debuff": "削弱",
+        "Fast-Redeploy": "快速复活",
+        "Shift": "位移",
+        "Summon": "召唤",
+        "Robot": "",
+        "Elemental": "",
+    }
+}
+
+
+# Misreads and partial labels seen in real scans, matched like keywords
+fuzzy_matches = {
+    "CUARD": "Guard", "GUARD": "Guard", "SNIPER": "Sniper",
+    "DEFENDER": "Defender", "MEDIC": "Medic", "SUPPORTER": "Supporter",
+    "CASTER": "Caster", "SPECIALIST": "Specialist", "VANGUARD": "Vanguard",
+    "MELEE": "Melee", "RANGED": "Ranged", "近卫": "Guard",
+    "狙击": "Sniper", "重装": "Defender", "医疗": "Medic",
+    "辅助": "Supporter", "术师": "Caster", "特种": "Specialist",
+    "先锋": "Vanguard", "近战": "Melee", "远程": "Ranged"
+}
+ALIAS_CONFIDENCE = 0.9
+MAX_BIGRAM_WORDS = 2
+MAX_CACHED_WORDS = 4096
+CJK_CHAR = r'\u4e00-\u9fff'
+
+
+def edit_distance(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def max_edits(keyword):
+    # Short keywords are too easy to hit by accident; allow more slack on long ones
+    length = len(keyword)
+    if length < 4:
+        return 0
+    return 1 if length <= 7 else 2
+
+
+class BKTree:
+    # Metric tree over the vocabulary: a query only descends into children
+    # whose edge distance lies within `limit` of the query's distance.
+    def __init__(self, words=()):
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word, limit):
+        found = []
+        pending = [self.root] if self.root else []
+        while pending:
+            node_word, children = pending.pop()
+            distance = edit_distance(word, node_word)
+            if distance <= limit:
+                found.append((distance, node_word))
+            pending.extend(child for edge, child in children.items() if distance - limit <= edge <= distance + limit)
+        return sorted(found)
+
+
+class TagHit:
+    def __init__(self, tag, text, confidence, distance=0):
+        self.tag = tag
+        self.text = text
+        self.confidence = confidence
+        self.distance = distance
+
+    def __repr__(self):
+        return f"TagHit({self.tag!r}, {self.text!r}, {self.confidence:.2f})"
+
+
+class TagExtractor:
+    # Built once: one compiled alternation over every EN/CN keyword finds all
+    # exact hits in a single pass, then leftover words are corrected against
+    # a BK-tree of the vocabulary within a length-scaled edit distance.
+    def __init__(self, tags_by_category=arknights_tags_by_category, aliases=fuzzy_matches):
+        self.order = {}
+        self.keywords = {}
+        for tags in tags_by_category.values():
+            for eng_tag, chi_tag in tags.items():
+                self.order[eng_tag] = len(self.order)
+                self.keywords[eng_tag.upper()] = (eng_tag, 1.0)
+                if chi_tag:
+                    self.keywords[chi_tag] = (eng_tag, 1.0)
+        for alias, tag in aliases.items():
+            self.keywords.setdefault(alias.upper(), (tag, ALIAS_CONFIDENCE))
+
+        by_length = sorted(self.keywords, key=len, reverse=True)
+        latin = [re.escape(k) for k in by_length if not re.search(f'[{CJK_CHAR}]', k)]
+        cjk = [re.escape(k) for k in by_length if re.search(f'[{CJK_CHAR}]', k)]
+        self.pattern = re.compile(r'\b(?:' + '|'.join(latin) + r')\b|' + '|'.join(cjk))
+        self.latin_word = re.compile(r'[A-Z0-9][A-Z0-9\-]*')
+        self.cjk_run = re.compile(f'[{CJK_CHAR}]+')
+
+        vocabulary = [k for k, (_, confidence) in self.keywords.items() if confidence == 1.0]
+        cjk_vocabulary = [k for k in vocabulary if re.search(f'[{CJK_CHAR}]', k)]
+        self.latin_tree = BKTree(k for k in vocabulary if k not in cjk_vocabulary)
+        self.cjk_tree = BKTree(cjk_vocabulary)
+        self.cjk_lengths = sorted({len(k) for k in cjk_vocabulary}, reverse=True)
+        self._closest_cache = {}
+
+    @staticmethod
+    def normalize(text):
+        text = re.sub(r'[^\w\s\u4e00-\u9fff\-]', ' ', text.upper())
+        # Tesseract often puts spaces between CJK characters
+        return re.sub(r'(?<=[\u4e00-\u9fff])\s+(?=[\u4e00-\u9fff])', '', text)
+
+    def closest(self, tree, word):
+        # OCR streams repeat the same misreads, so remember every lookup
+        # (no match is cached as None). Shared across threads: the result is
+        # returned from a local, so a clear() in between cannot lose it.
+        key = (tree is self.cjk_tree, word)
+        try:
+            return self._closest_cache[key]
+        except KeyError:
+            pass
+        match = self._search(tree, word)
+        if len(self._closest_cache) >= MAX_CACHED_WORDS:
+            self._closest_cache.clear()
+        self._closest_cache[key] = match
+        return match
+
+    def _search(self, tree, word):
+        limit = max_edits(word)
+        if not limit:
+            return None
+        found = [(d, k) for d, k in tree.search(word, limit) if d <= max_edits(k)]
+        # Two equally close tags means the misread is ambiguous
+        if not found or (len(found) > 1 and found[0][0] == found[1][0] and
+                         self.keywords[found[0][1]][0] != self.keywords[found[1][1]][0]):
+            return None
+        return found[0]
+
+    def fuzzy_latin(self, leftover, hits):
+        words = self.latin_word.findall(leftover)
+        i = 0
+        while i < len(words):
+            for span in range(min(MAX_BIGRAM_WORDS, len(words) - i), 0, -1):
+                candidate = " ".join(words[i:i + span])
+                match = self.closest(self.latin_tree, candidate)
+                if match:
+                    distance, keyword = match
+                    hits.append(TagHit(self.keywords[keyword][0], candidate, 1 - distance / len(keyword), distance))
+                    i += span
+                    break
+            else:
+                i += 1
+
+    def fuzzy_cjk(self, leftover, hits):
+        for run in self.cjk_run.findall(leftover):
+            start = 0
+            while start < len(run):
+                for length in self.cjk_lengths:
+                    window = run[start:start + length]
+                    match = self.closest(self.cjk_tree, window) if len(window) == length else None
+                    if match:
+                        distance, keyword = match
+                        hits.append(TagHit(self.keywords[keyword][0], window, 1 - distance / len(keyword), distance))
+                        start += length
+                        break
+                else:
+                    start += 1
+
+    def extract(self, text):
+        # -> one TagHit per tag, best confidence kept, in vocabulary order
+        text = self.normalize(text)
+        hits = []
+        pieces = []
+        last = 0
+        for match in self.pattern.finditer(text):
+            tag, confidence = self.keywords[match.group()]
+            hits.append(TagHit(tag, match.group(), confidence))
+            pieces.append(text[last:match.start()])
+            last = match.end()
+        pieces.append(text[last:])
+        leftover = " ".join(pieces)
+        self.fuzzy_latin(leftover, hits)
+        self.fuzzy_cjk(leftover, hits)
+
+        best = {}
+        for hit in hits:
+            if hit.tag not in best or hit.confidence > best[hit.tag].confidence:
+                best[hit.tag] = hit
+        return sorted(best.values(), key=lambda hit: self.order.get(hit.tag, len(self.order)))
+
+
+_extractor = TagExtractor()
+
+
+def extract_tag_hits(text):
+    return _extractor.extract(text)
+
+
+def extract_tags_from_text(text):
+    return [hit.tag for hit in _extractor.extract(text)]
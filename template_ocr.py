@@ -0,0 +1,212 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy
+from PIL import Image, ImageDraw, ImageFont
+
+from tags import arknights_tags_by_category
+
+FEATURE_SIZE = (64, 16)
+RENDER_SIZES = (18, 24, 32, 40)
+DEFAULT_MIN_CONFIDENCE = 0.8
+MAX_ASPECT_RATIO_DRIFT = 1.5
+MIN_COMPONENT_AREA = 4
+MIN_COMPONENT_RATIO = 0.02
+MIN_MARGIN = 0.03
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tag_templates")
+FONT_CANDIDATES = {
+    "ENG": ("arialbd.ttf", "arial.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans.ttf", "LiberationSans-Bold.ttf"),
+    "CHI": ("msyhbd.ttc", "msyh.ttc", "simhei.ttf", "NotoSansCJK-Bold.ttc", "NotoSansCJK-Regular.ttc",
+            "wqy-microhei.ttc")
+}
+
+
+def tag_vocabulary():
+    # (tag, text as shown in game, language) for every recognisable label
+    for tags in arknights_tags_by_category.values():
+        for eng_tag, chi_tag in tags.items():
+            yield eng_tag, eng_tag.upper(), "ENG"
+            if chi_tag:
+                yield eng_tag, chi_tag, "CHI"
+
+
+def normalize_glyphs(gray):
+    # White text on black with the tag-box border and speckle removed,
+    # cropped tight to the text
+    if gray.ndim == 3:
+        gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    height, width = binary.shape
+    x, y, w, h, area = (stats[:, i] for i in range(5))
+    keep = (x > 0) & (y > 0) & (x + w < width) & (y + h < height)
+    keep &= (w < width * 0.9) & (h < height * 0.9)
+    keep[0] = False
+    if not keep.any():
+        return None
+    keep &= area >= max(MIN_COMPONENT_AREA, area[keep].max() * MIN_COMPONENT_RATIO)
+    left, top = x[keep].min(), y[keep].min()
+    right, bottom = (x + w)[keep].max(), (y + h)[keep].max()
+    mask = keep[labels[top:bottom, left:right]]
+    return mask.astype(numpy.uint8) * 255
+
+
+def glyph_features(glyphs):
+    resized = cv2.resize(glyphs, FEATURE_SIZE, interpolation=cv2.INTER_AREA).astype(numpy.float32).ravel()
+    resized -= resized.mean()
+    norm = numpy.linalg.norm(resized)
+    if norm == 0:
+        return None
+    return resized / norm
+
+
+def load_font(lang, size, font_paths=None):
+    for name in (font_paths or {}).get(lang, ()) + FONT_CANDIDATES[lang]:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def font_covers(font, lang):
+    # Fonts without CJK glyphs render every label as identical boxes
+    if lang != "CHI":
+        return True
+    return not numpy.array_equal(render_text("近卫", font), render_text("狙击", font))
+
+
+def render_text(text, font):
+    left, top, right, bottom = font.getbbox(text)
+    pad = 8
+    canvas = Image.new('L', (right - left + pad * 2, bottom - top + pad * 2), 0)
+    ImageDraw.Draw(canvas).text((pad - left, pad - top), text, fill=255, font=font)
+    return numpy.asarray(canvas)
+
+
+class TemplateMatch:
+    def __init__(self, tag, text, lang, confidence, margin):
+        self.tag = tag
+        self.text = text
+        self.lang = lang
+        self.confidence = confidence
+        self.margin = margin
+
+    def __repr__(self):
+        return f"TemplateMatch({self.tag!r}, {self.lang}, {self.confidence:.3f}, margin={self.margin:.3f})"
+
+
+class TemplateRecognizer:
+    # Nearest-neighbour classifier over the closed tag vocabulary. Templates
+    # are rendered from system fonts at several sizes and, when present,
+    # harvested from labelled crops in data/tag_templates/<Tag>/*.png.
+    def __init__(self, template_dir=DEFAULT_TEMPLATE_DIR, min_confidence=DEFAULT_MIN_CONFIDENCE,
+                 render_sizes=RENDER_SIZES, font_paths=None):
+        self.min_confidence = min_confidence
+        self.entries = []
+        features = []
+        aspects = []
+
+        def add(glyphs, tag, text, lang):
+            if glyphs is None:
+                return
+            vector = glyph_features(glyphs)
+            if vector is None:
+                return
+            self.entries.append((tag, text, lang))
+            features.append(vector)
+            aspects.append(glyphs.shape[1] / glyphs.shape[0])
+
+        for size in render_sizes:
+            fonts = {lang: load_font(lang, size, font_paths) for lang in FONT_CANDIDATES}
+            usable = {lang for lang, font in fonts.items() if font_covers(font, lang)}
+            for tag, text, lang in tag_vocabulary():
+                if lang in usable:
+                    add(normalize_glyphs(render_text(text, fonts[lang])), tag, text, lang)
+
+        for tag, text, lang, glyphs in self.harvested(template_dir):
+            add(glyphs, tag, text, lang)
+
+        tag_order = list(dict.fromkeys(tag for tag, _, _ in self.entries))
+        self.tag_ids = numpy.array([tag_order.index(tag) for tag, _, _ in self.entries], dtype=numpy.int16)
+        self.features = numpy.array(features, dtype=numpy.float32)
+        self.log_aspects = numpy.log(numpy.array(aspects, dtype=numpy.float32))
+
+    @staticmethod
+    def harvested(template_dir):
+        # Folders are named after the EN tag or the CN label they hold
+        if not template_dir or not os.path.isdir(template_dir):
+            return
+        labels = {}
+        for tag, text, lang in tag_vocabulary():
+            labels[text if lang == "CHI" else tag] = (tag, text, lang)
+        for folder in sorted(os.listdir(template_dir)):
+            if folder not in labels:
+                continue
+            tag, text, lang = labels[folder]
+            folder_path = os.path.join(template_dir, folder)
+            for name in sorted(os.listdir(folder_path)):
+                try:
+                    with Image.open(os.path.join(folder_path, name)) as image:
+                        crop = numpy.asarray(image.convert('L'))
+                except OSError:
+                    continue
+                yield tag, text, lang, normalize_glyphs(crop)
+
+    def classify(self, image):
+        gray = image if isinstance(image, numpy.ndarray) else numpy.asarray(image.convert('L'))
+        glyphs = normalize_glyphs(gray)
+        if glyphs is None or not len(self.entries):
+            return None
+        vector = glyph_features(glyphs)
+        if vector is None:
+            return None
+        scores = self.features @ vector
+        drift = numpy.abs(self.log_aspects - numpy.log(glyphs.shape[1] / glyphs.shape[0]))
+        scores[drift > numpy.log(MAX_ASPECT_RATIO_DRIFT)] = -1.0
+        best = int(numpy.argmax(scores))
+        tag, text, lang = self.entries[best]
+        others = scores[self.tag_ids != self.tag_ids[best]]
+        runner_up = others.max() if others.size else -1.0
+        return TemplateMatch(tag, text, lang, float(scores[best]), float(scores[best] - runner_up))
+
+    def recognize(self, image):
+        # Confident match -> (lang, text) like detect_language_and_text, else None
+        match = self.classify(image)
+        if match is None or match.confidence < self.min_confidence or match.margin < MIN_MARGIN:
+            return None, match
+        return ("CHI" if match.lang == "CHI" else "ENG", match.text), match
+
+
+_recognizer = None
+
+
+def get_recognizer():
+    global _recognizer
+    if _recognizer is None:
+        _recognizer = TemplateRecognizer()
+    return _recognizer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python template_ocr.py", description="Classify tag crops against the template bank.")
+    parser.add_argument('images', nargs='+', help="preprocessed tag block images")
+    parser.add_argument('--templates', default=DEFAULT_TEMPLATE_DIR, help="labelled crops, one folder per tag")
+    args = parser.parse_args(argv)
+
+    recognizer = TemplateRecognizer(template_dir=args.templates)
+    print(f"{len(recognizer.entries)} templates loaded")
+    for path in args.images:
+        with Image.open(path) as image:
+            match = recognizer.classify(image)
+        print(f"{path}: {match}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
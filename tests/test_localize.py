@@ -0,0 +1,75 @@
+import numpy
+import pytest
+
+from benchmark import BOX_GAP, BOX_SIZE, render_panel
+from localize import TagBoxLocator, box_iou, detect_tag_boxes, find_tag_panels
+
+ROLL = ["Guard", "Defense", "Healing", "DPS", "Support"]
+
+
+def panel(seed, scale=1.0, noise=6.0, jpeg_quality=None):
+    # -> (gray panel, the (row, col, box) layout render_panel drew)
+    gray = numpy.asarray(render_panel(ROLL, "ENG", numpy.random.default_rng(seed), scale, noise, jpeg_quality).convert('L'))
+    # render_panel's first draw is the margin, so the same seed reproduces it
+    margin_x, margin_y = (int(m * scale) for m in numpy.random.default_rng(seed).integers(10, 70, 2))
+    box_w, box_h = int(BOX_SIZE[0] * scale), int(BOX_SIZE[1] * scale)
+    gap_x, gap_y = int(BOX_GAP[0] * scale), int(BOX_GAP[1] * scale)
+    drawn = []
+    for row, count in enumerate((3, 2)):
+        for col in range(count):
+            x, y = margin_x + col * (box_w + gap_x), margin_y + row * (box_h + gap_y)
+            drawn.append((row, col, (x, y, x + box_w, y + box_h)))
+    return gray, drawn
+
+
+def assert_same_layout(placed, drawn, offset=(0, 0)):
+    assert placed is not None
+    assert [(row, col) for row, col, _ in placed] == [(row, col) for row, col, _ in drawn]
+    for (_, _, box), (_, _, expected) in zip(placed, drawn):
+        shifted = (box[0] + offset[0], box[1] + offset[1], box[2] + offset[0], box[3] + offset[1])
+        assert box_iou(shifted, expected) >= 0.85, (box, expected)
+
+
+@pytest.mark.parametrize('scale', [0.6, 1.0, 1.4])
+@pytest.mark.parametrize('jpeg_quality', [None, 60])
+def test_tag_boxes_are_found_on_a_rendered_panel(scale, jpeg_quality):
+    for seed in range(3):
+        gray, drawn = panel(seed, scale, jpeg_quality=jpeg_quality)
+        assert_same_layout(detect_tag_boxes(gray), drawn)
+
+
+def test_a_frame_without_tag_boxes_falls_back_to_the_grid():
+    gray = numpy.full((300, 900), 40, dtype=numpy.uint8)
+    assert detect_tag_boxes(gray) is None
+    assert TagBoxLocator().locate(gray) == (None, "grid")
+
+
+def test_locator_reuses_geometry_until_the_boxes_move():
+    locator = TagBoxLocator()
+    gray, drawn = panel(0)
+    placed, source = locator.locate(gray)
+    assert source == "detected"
+    assert_same_layout(placed, drawn)
+    assert locator.locate(panel(0, noise=8.0)[0]) == (placed, "cached")
+
+    moved = numpy.full_like(gray, 35)
+    moved[20:, 30:] = gray[:-20, :-30]
+    placed, source = locator.locate(moved)
+    assert source == "detected"
+    assert_same_layout(placed, drawn, offset=(-30, -20))
+    assert (locator.detections, locator.cache_hits) == (2, 1)
+
+
+def test_every_panel_on_a_screen_is_found_in_reading_order():
+    screen = numpy.full((1080, 1920), 30, dtype=numpy.uint8)
+    origins = [(20, 40), (1000, 40), (20, 560)]
+    layouts = []
+    for seed, (x, y) in enumerate(origins):
+        gray, drawn = panel(seed, scale=0.8)
+        height, width = gray.shape
+        screen[y:y + height, x:x + width] = gray
+        layouts.append([(row, col, (bx1 + x, by1 + y, bx2 + x, by2 + y)) for row, col, (bx1, by1, bx2, by2) in drawn])
+    panels = find_tag_panels(screen)
+    assert len(panels) == len(origins)
+    for (panel_box, placed), drawn in zip(panels, layouts):
+        assert_same_layout(placed, drawn, offset=panel_box[:2])
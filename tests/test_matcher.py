@@ -0,0 +1,74 @@
+import csv
+from itertools import combinations
+
+import numpy
+import pytest
+
+from answer_table import ROLL_SIZE, load_table, roll_vocabulary
+from matcher import DEFAULT_CSV_PATH, TOP_OPERATOR_TAG, TagMatcher
+
+SAMPLED_ROLLS = 300
+
+
+def scan_csv(input_tags, csv_path=DEFAULT_CSV_PATH):
+    # The original lookup: read the CSV row by row and group operators by
+    # every combination of the input tags they carry
+    groups = {}
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            op_tags = [t.strip() for t in row['tags_en'].split(';')]
+            rarity = int(row['rarity'])
+            if rarity == 6 and TOP_OPERATOR_TAG not in input_tags:
+                continue
+            match_tags = [t for t in input_tags if t in op_tags]
+            for r in range(1, len(match_tags) + 1):
+                for combo in combinations(match_tags, r):
+                    groups.setdefault(frozenset(combo), []).append((row['name_en'], rarity))
+    answer = set()
+    for combo, ops in groups.items():
+        above_one = [rarity for _, rarity in ops if rarity > 1]
+        answer.add((combo, frozenset(name for name, _ in ops), min(above_one) if above_one else 1))
+    return answer
+
+
+def as_set(groups):
+    return {(frozenset(group['tags']), frozenset(op['name'] for op in group['operators']), group['lowest_rarity'])
+            for group in groups}
+
+
+def sampled_rolls(size=ROLL_SIZE, count=SAMPLED_ROLLS, seed=0):
+    rng = numpy.random.default_rng(seed)
+    vocabulary = roll_vocabulary()
+    rolls = [list(rng.choice(vocabulary, size, replace=False)) for _ in range(count)]
+    # Top Operator rolls are rare in a uniform sample but change the answer
+    others = [tag for tag in vocabulary if tag != TOP_OPERATOR_TAG]
+    rolls += [[TOP_OPERATOR_TAG] + list(rng.choice(others, size - 1, replace=False)) for _ in range(count // 10)]
+    return rolls
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return TagMatcher(use_table=False)
+
+
+@pytest.mark.parametrize('size', [1, 3, ROLL_SIZE])
+def test_bitmask_matcher_agrees_with_a_csv_scan(matcher, size):
+    for roll in sampled_rolls(size):
+        assert as_set(matcher.match(roll)) == scan_csv(roll), roll
+
+
+def test_answer_table_agrees_with_a_csv_scan():
+    matcher = TagMatcher(use_table=True)
+    assert matcher.table is not None
+    for roll in sampled_rolls(seed=1):
+        groups = matcher.table.lookup(roll, matcher.operators, matcher.tag_names)
+        assert groups is not None
+        expected = scan_csv(roll)
+        assert as_set(groups) == expected, roll
+        assert matcher.table.guaranteed_rarity(roll) == max((rarity for _, _, rarity in expected), default=0), roll
+
+
+def test_answer_table_leaves_partial_rolls_to_the_matcher():
+    table = load_table(DEFAULT_CSV_PATH)
+    assert table.lookup(["Guard", "Defense"], [], []) is None
+    assert table.guaranteed_rarity(["Guard", "Defense", "Healing", "DPS", "Not A Tag"]) is None
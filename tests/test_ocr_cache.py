@@ -0,0 +1,61 @@
+import cv2
+import numpy
+import pytest
+from PIL import Image
+
+from ocr_cache import OCRCache
+from preprocess import PreparedFrame
+
+BOX = (0, 0, 260, 60)
+
+
+def tag_block(text, noise=0.0, seed=0, shift=0):
+    # One tag box as the pipeline sees it: preprocessed and upscaled
+    image = numpy.full((BOX[3], BOX[2], 3), 40, dtype=numpy.uint8)
+    cv2.rectangle(image, (3, 3), (256, 56), (200, 200, 200), 2)
+    (width, height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+    cv2.putText(image, text, ((BOX[2] - width) // 2 + shift, (BOX[3] + height) // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                0.8, (230, 230, 230), 2)
+    if noise:
+        jitter = numpy.random.default_rng(seed).normal(0, noise, image.shape)
+        image = numpy.clip(image + jitter, 0, 255).astype(numpy.uint8)
+    return PreparedFrame(Image.fromarray(image)).block(BOX, refine=False)
+
+
+def test_a_noisy_recapture_hits_and_another_tag_misses():
+    cache = OCRCache()
+    cache.put(tag_block("GUARD"), ("ENG", "GUARD"))
+    for seed in range(5):
+        assert cache.get(tag_block("GUARD", noise=3.0, seed=seed, shift=seed % 3 - 1)) == ("ENG", "GUARD")
+    for other in ("DEFENSE", "CASTER", "SNIPER"):
+        assert cache.get(tag_block(other)) is None
+    assert cache.stats()['hits'] == 5
+
+
+@pytest.mark.parametrize('tag', ["SLOW", "SHIFT", "DPS", "AOE", "NUKER"])
+def test_short_tags_do_not_collide(tag):
+    cache = OCRCache()
+    for other in ("SLOW", "SHIFT", "DPS", "AOE", "NUKER"):
+        if other != tag:
+            cache.put(tag_block(other), ("ENG", other))
+    assert cache.get(tag_block(tag)) is None
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = OCRCache(max_entries=2)
+    for tag in ("GUARD", "MEDIC", "SNIPER"):
+        cache.put(tag_block(tag), ("ENG", tag))
+    assert cache.get(tag_block("GUARD")) is None
+    assert cache.get(tag_block("SNIPER")) == ("ENG", "SNIPER")
+
+
+def test_results_survive_a_restart(tmp_path):
+    db_path = str(tmp_path / "ocr_cache.sqlite3")
+    cache = OCRCache(db_path=db_path)
+    cache.put(tag_block("VANGUARD"), ("ENG", "VANGUARD"))
+    cache.close()
+    reopened = OCRCache(db_path=db_path)
+    try:
+        assert reopened.get(tag_block("VANGUARD", noise=2.0)) == ("ENG", "VANGUARD")
+    finally:
+        reopened.close()
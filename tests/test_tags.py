@@ -0,0 +1,56 @@
+import threading
+
+import tags
+from tags import TagExtractor, extract_tag_hits, extract_tags_from_text
+
+
+def hits(text):
+    return {hit.tag: hit.confidence for hit in extract_tag_hits(text)}
+
+
+def test_exact_tags_are_read_with_full_confidence():
+    assert hits("Guard Defense") == {'Guard': 1.0, 'Defense': 1.0}
+    assert extract_tags_from_text("近卫干员") == ['Guard']
+
+
+def test_misreads_are_corrected_with_lower_confidence():
+    found = hits("GUARO DEFENS Snlper Crowd Contro1 Seni0r Operator")
+    assert set(found) == {'Guard', 'Defense', 'Sniper', 'Crowd Control', 'Senior Operator'}
+    assert all(0.75 <= confidence < 1.0 for confidence in found.values())
+
+
+def test_noise_reads_no_tags_and_repeats_collapse():
+    assert extract_tag_hits("xyz qqq") == []
+    assert extract_tags_from_text("Healing DPS healing") == ['Healing', 'DPS']
+
+
+def test_closest_lookups_are_cached_and_reused():
+    extractor = TagExtractor()
+    calls = []
+    search = extractor._search
+    extractor._search = lambda tree, word: calls.append(word) or search(tree, word)
+    first = extractor.extract("GUARO xyz")
+    second = extractor.extract("GUARO xyz")
+    assert [hit.tag for hit in first] == [hit.tag for hit in second] == ['Guard']
+    assert len(calls) == len(set(calls))
+    assert any(key[1] == "GUARO" for key in extractor._closest_cache)
+
+
+def test_closest_survives_a_concurrent_clear(monkeypatch):
+    monkeypatch.setattr(tags, 'MAX_CACHED_WORDS', 1)
+    extractor = TagExtractor()
+    errors = []
+
+    def worker(word):
+        try:
+            for _ in range(300):
+                extractor.closest(extractor.latin_tree, word)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(word,)) for word in ("GUARO", "SNLPER", "DEFENS", "HEALNG")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
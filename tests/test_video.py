@@ -0,0 +1,79 @@
+import io
+
+import cv2
+import numpy
+import pytest
+
+import ocr_backend
+import video
+from benchmark import render_panel
+
+FRAME_SIZE = (960, 540)
+ROLL_A = ["Guard", "DPS", "Slow", "AoE", "Nuker"]
+ROLL_B = ["Medic", "Healing", "Shift", "Debuff", "Summon"]
+
+
+class FakeBackend:
+    name = "fake"
+
+    def image_to_string(self, image, psm=None):
+        return "Guard"
+
+    def image_to_data(self, image, psm=None):
+        return []
+
+    def warm_up(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_ocr(monkeypatch):
+    monkeypatch.setattr(ocr_backend, 'create_backend', lambda *args, **kwargs: FakeBackend())
+    ocr_backend._backends.clear()
+    yield
+    ocr_backend._backends.clear()
+
+
+def screen(tags=None, noise=0.0, seed=0):
+    frame = numpy.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 30, dtype=numpy.uint8)
+    if tags:
+        panel = cv2.cvtColor(numpy.asarray(render_panel(tags, "ENG", numpy.random.default_rng(1), 0.75, 0)),
+                             cv2.COLOR_RGB2BGR)
+        frame[100:100 + panel.shape[0], 100:100 + panel.shape[1]] = panel
+    if noise:
+        jitter = numpy.random.default_rng(seed).normal(0, noise, frame.shape)
+        frame = numpy.clip(frame + jitter, 0, 255).astype(numpy.uint8)
+    return frame
+
+
+def write_video(path, shots, noise):
+    # shots: (tags or None for an empty screen, frames); every frame gets fresh noise
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 30, FRAME_SIZE)
+    seed = 0
+    for tags, frames in shots:
+        for _ in range(frames):
+            seed += 1
+            writer.write(screen(tags, noise, seed))
+    writer.release()
+
+
+@pytest.mark.parametrize('noise', [0.0, 1.5])
+def test_a_roll_shown_again_is_a_duplicate(tmp_path, noise):
+    path = tmp_path / "rolls.avi"
+    write_video(path, [(ROLL_A, 45), (None, 15), (ROLL_A, 45), (ROLL_B, 45)], noise)
+    counts = video.VideoIngest(io.StringIO(), cache=None).run(str(path))
+    assert counts['rolls'] == 2
+    assert counts['duplicates'] == 1
+
+
+def test_one_changed_tag_is_a_new_roll():
+    dedup = video.RollDeduplicator()
+    seen = []
+    for tags in (ROLL_A, ROLL_A[:4] + ["Shift"], ROLL_A):
+        gray = cv2.cvtColor(screen(tags, 1.5, len(seen)), cv2.COLOR_BGR2GRAY)
+        panel = video.find_tag_panels(gray)[0]
+        seen.append(dedup.is_new(video.panel_signature(gray, panel)))
+    assert seen == [True, True, False]
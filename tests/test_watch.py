@@ -0,0 +1,52 @@
+import cv2
+import numpy
+
+from watch import FrameDiffGate
+
+BOX_SIZE = (260, 70)
+
+
+def tag_panel(tags, noise=0.0, seed=0):
+    # Same five-box layout every roll; only the words inside the boxes change
+    frame = numpy.full((240, 900, 3), 40, dtype=numpy.uint8)
+    for i, tag in enumerate(tags):
+        x, y = 30 + (i % 3) * 290, 30 + (i // 3) * 110
+        cv2.rectangle(frame, (x, y), (x + BOX_SIZE[0], y + BOX_SIZE[1]), (225, 225, 225), 2)
+        cv2.putText(frame, tag, (x + 20, y + 45), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (230, 230, 230), 2)
+    if noise:
+        jitter = numpy.random.default_rng(seed).normal(0, noise, frame.shape)
+        frame = numpy.clip(frame + jitter, 0, 255).astype(numpy.uint8)
+    return frame
+
+
+def passes(gate, frame, polls=4, noise=3.0):
+    return sum(gate.update(tag_panel(frame, noise, seed)) for seed in range(polls))
+
+
+def test_different_rolls_with_the_same_layout_both_pass():
+    gate = FrameDiffGate()
+    assert passes(gate, ["Guard", "Defense", "Healing", "DPS", "Support"]) == 1
+    assert passes(gate, ["Caster", "Slow", "Nuker", "Sniper", "Guard"]) == 1
+
+
+def test_one_changed_tag_passes():
+    gate = FrameDiffGate()
+    assert passes(gate, ["Guard", "Defense", "Healing", "DPS", "Support"]) == 1
+    assert passes(gate, ["Guard", "Defense", "Healing", "DPS", "Shift"]) == 1
+
+
+def test_unchanged_roll_is_not_rescanned():
+    gate = FrameDiffGate()
+    roll = ["Guard", "Defense", "Healing", "DPS", "Support"]
+    assert passes(gate, roll) == 1
+    assert passes(gate, roll, polls=8) == 0
+
+
+def test_rearm_on_motion_rescans_after_the_panel_moves_away_and_back():
+    roll = ["Guard", "Defense", "Healing", "DPS", "Support"]
+    blank = numpy.full((240, 900, 3), 40, dtype=numpy.uint8)
+    for rearm, expected in ((False, 0), (True, 1)):
+        gate = FrameDiffGate(rearm_on_motion=rearm)
+        assert passes(gate, roll) == 1
+        gate.update(blank)
+        assert passes(gate, roll) == expected
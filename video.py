@@ -0,0 +1,210 @@
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from PIL import Image
+
+import ocr_backend
+import pipeline
+from answer_table import load_table
+from localize import find_tag_panels
+from matcher import DEFAULT_CSV_PATH, TagMatcher
+from ocr_cache import OCRCache, difference_hash
+from ocr_cascade import OCRCascade
+from ocr_profile import PROFILE_NAMES, LanguageLock
+from template_ocr import TemplateRecognizer
+from watch import FrameDiffGate
+
+DEFAULT_SAMPLE_FPS = 4.0
+DEFAULT_WORKERS = 2
+MAX_PENDING_SCANS = 4
+# Bits two hashes of the same tag box may differ by. Measured on rendered
+# panels re-encoded as JPEG: the same box differs by at most 4 bits at noise
+# sigma 1.5 (9 at sigma 3 on the smallest scale), different tags by 10 or more
+DUPLICATE_DISTANCE = 6
+RECENT_ROLLS = 64
+
+
+def iter_frames(path, sample_fps=DEFAULT_SAMPLE_FPS):
+    # Lazily decodes a recording: yields (frame index, seconds, BGR frame) for
+    # about sample_fps frames per second of video. Skipped frames are only
+    # grabbed, never converted, and nothing is kept between yields.
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise OSError(f"Cannot open video {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        step = max(1, round(fps / sample_fps)) if fps > 0 else 1
+        index = 0
+        while capture.grab():
+            if index % step == 0:
+                ok, frame = capture.retrieve()
+                if ok:
+                    seconds = index / fps if fps > 0 else capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                    yield index, seconds, frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def panel_signature(gray, panel):
+    # One hash per tag box: panels share their box layout, so only the box
+    # contents tell two rolls apart
+    (x1, y1, _, _), placed = panel
+    return tuple(difference_hash(gray[y1 + by1:y1 + by2, x1 + bx1:x1 + bx2])
+                 for _, _, (bx1, by1, bx2, by2) in placed)
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+
+class RollDeduplicator:
+    # Remembers the signatures of the last few rolls scanned, so a panel that
+    # is shown again (or re-stabilises after a menu flicker) is not scanned
+    # twice. A roll matches when every one of its boxes is within distance.
+    def __init__(self, distance=DUPLICATE_DISTANCE, size=RECENT_ROLLS):
+        self.distance = distance
+        self._recent = deque(maxlen=size)
+
+    def is_new(self, signature):
+        for seen in self._recent:
+            if len(seen) == len(signature) and all((a ^ b).bit_count() <= self.distance for a, b in zip(seen, signature)):
+                return False
+        self._recent.append(signature)
+        return True
+
+
+class VideoIngest:
+    # decode -> diff gate -> panel search -> hash dedup -> tag pipeline.
+    # Only frames that changed and then held still for a couple of samples
+    # are searched for tag panels, and only unseen panels reach OCR. Scans run
+    # on a bounded pool and results are written in frame order.
+    def __init__(self, out=sys.stdout, workers=DEFAULT_WORKERS, sample_fps=DEFAULT_SAMPLE_FPS,
+                 max_pending=MAX_PENDING_SCANS, **scan_kwargs):
+        self.out = out
+        self.workers = workers
+        self.sample_fps = sample_fps
+        self.max_pending = max_pending
+        self.scan_kwargs = scan_kwargs
+        self.counts = {'frames': 0, 'stable': 0, 'recruit_frames': 0, 'panels': 0, 'duplicates': 0, 'rolls': 0,
+                       'video_s': 0.0}
+
+    def _scan(self, source, index, seconds, frame, panels):
+        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        result = pipeline.recognize_slots(image, panels=[panel for _, panel in panels], **self.scan_kwargs)
+        records = []
+        for (slot_index, _), slot in zip(panels, result['slots']):
+            summary = pipeline.result_summary(slot['result'])
+            combos = summary['combos']
+            records.append({
+                'video': source,
+                'frame': index,
+                'time_s': round(seconds, 3),
+                'time': format_time(seconds),
+                'slot': slot_index,
+                'box': list(slot['box']),
+                'tags': summary['tags'],
+                'tag_confidence': summary['tag_confidence'],
+                'guaranteed_rarity': max((combo['lowest_rarity'] for combo in combos), default=None),
+                'combos': combos,
+                'blocks': summary['blocks']
+            })
+        return records
+
+    def _write(self, future):
+        for record in future.result():
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.counts['rolls'] += 1
+        self.out.flush()
+
+    def run(self, source):
+        gate = FrameDiffGate(rearm_on_motion=True)
+        dedup = RollDeduplicator()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="video") as pool:
+            for index, seconds, frame in iter_frames(source, self.sample_fps):
+                self.counts['frames'] += 1
+                self.counts['video_s'] = seconds
+                if not gate.update(frame):
+                    continue
+                self.counts['stable'] += 1
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                panels = find_tag_panels(gray)
+                if not panels:
+                    continue
+                self.counts['recruit_frames'] += 1
+                self.counts['panels'] += len(panels)
+                fresh = []
+                for slot_index, panel in enumerate(panels):
+                    if dedup.is_new(panel_signature(gray, panel)):
+                        fresh.append((slot_index, panel))
+                    else:
+                        self.counts['duplicates'] += 1
+                if not fresh:
+                    continue
+                # Bounded: wait for the oldest scan before queueing another frame
+                while len(pending) >= self.max_pending:
+                    self._write(pending.popleft())
+                pending.append(pool.submit(self._scan, source, index, seconds, frame, fresh))
+            while pending:
+                self._write(pending.popleft())
+        return self.counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m video", description="Extract recruitment rolls from screen recordings and stream them as JSONL.")
+    parser.add_argument('videos', nargs='+', help="recordings to read (anything OpenCV can decode)")
+    parser.add_argument('-o', '--out', default=None, help="JSONL file to write (default: stdout)")
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help="frames scanned at once")
+    parser.add_argument('--sample-fps', type=float, default=DEFAULT_SAMPLE_FPS, help="frames per second of video to look at")
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help="roster CSV to match against")
+    parser.add_argument('--templates', action='store_true', help="classify blocks against tag templates first, OCR only low-confidence ones")
+    parser.add_argument('--ocr-backend', choices=ocr_backend.BACKEND_NAMES, default="auto", help="OCR engine (default: tesserocr if installed, else pytesseract)")
+    parser.add_argument('--ocr-profile', choices=PROFILE_NAMES, default="auto", help="OCR language profile")
+    parser.add_argument('--stitch', action='store_true', help="OCR each panel's blocks in one stitched call")
+    parser.add_argument('--cascade', action='store_true', help="read each block cheaply first and escalate only unclear ones (fast tier needs tesserocr and a locked language)")
+    args = parser.parse_args(argv)
+
+    ocr_backend.set_backend_name(args.ocr_backend)
+    language = LanguageLock(args.ocr_profile)
+    try:
+        ocr_backend.get_backend(language.profile()).warm_up()
+    except Exception:
+        print("Tesseract OCR not found! Please install it with Chinese language support.", file=sys.stderr)
+        return 1
+    load_table(args.csv)
+    scan_kwargs = {'matcher': TagMatcher(args.csv), 'recognizer': TemplateRecognizer() if args.templates else None,
+                   'cache': OCRCache(), 'language': language, 'stitch': args.stitch,
+                   'cascade': OCRCascade() if args.cascade else None}
+
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    failures = 0
+    try:
+        for source in args.videos:
+            start = time.perf_counter()
+            ingest = VideoIngest(out, workers=args.workers, sample_fps=args.sample_fps, **scan_kwargs)
+            try:
+                counts = ingest.run(source)
+            except OSError as e:
+                print(e, file=sys.stderr)
+                failures += 1
+                continue
+            elapsed = time.perf_counter() - start
+            print(f"{source}: {counts['rolls']} rolls from {counts['frames']} sampled frames "
+                  f"({counts['stable']} stable, {counts['recruit_frames']} recruitment, {counts['duplicates']} duplicate panels) "
+                  f"in {elapsed:.1f}s, ~{counts['video_s'] / elapsed if elapsed else 0:.1f}x real time", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
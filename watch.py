@@ -0,0 +1,83 @@
+import cv2
+import numpy
+
+DEFAULT_THUMB_SIZE = (128, 64)
+# The thumbnail is compared cell by cell: a new roll keeps the panel layout
+# and only changes the text inside a few boxes, which barely moves the mean
+# over the whole frame but moves the cells holding that text a lot
+DEFAULT_DIFF_GRID = (16, 8)
+DEFAULT_DIFF_THRESHOLD = 3.0
+DEFAULT_STABLE_FRAMES = 2
+DEFAULT_MAX_RATE = 4.0
+DEFAULT_CPU_BUDGET = 0.25
+
+
+def thumbnail(frame, size=DEFAULT_THUMB_SIZE):
+    rgb = frame if isinstance(frame, numpy.ndarray) else numpy.asarray(frame.convert('RGB'))
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY) if rgb.ndim == 3 else rgb
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(numpy.int16)
+
+
+class FrameDiffGate:
+    # Decides whether a polled frame is worth a full scan: it must differ from
+    # the last scanned frame and have held still for stable_frames polls, so
+    # roll animations and unchanged panels never reach Tesseract. Two frames
+    # differ when any grid cell's mean difference is above threshold.
+    # rearm_on_motion also passes a frame that settles after any motion, for
+    # whole-screen frames where a new roll barely moves the thumbnail.
+    def __init__(self, threshold=DEFAULT_DIFF_THRESHOLD, stable_frames=DEFAULT_STABLE_FRAMES,
+                 thumb_size=DEFAULT_THUMB_SIZE, rearm_on_motion=False, grid=DEFAULT_DIFF_GRID):
+        self.threshold = threshold
+        self.stable_frames = stable_frames
+        self.thumb_size = thumb_size
+        self.grid = grid
+        self.rearm_on_motion = rearm_on_motion
+        self.reset()
+
+    def reset(self):
+        self._previous = None
+        self._scanned = None
+        self._stable_count = 0
+        self._moved = False
+
+    def difference(self, thumb, other):
+        # Largest per-cell mean absolute difference between two thumbnails
+        diff = numpy.abs(thumb - other).astype(numpy.float32)
+        return float(cv2.resize(diff, self.grid, interpolation=cv2.INTER_AREA).max())
+
+    def _differs(self, thumb, other):
+        return other is None or other.shape != thumb.shape or self.difference(thumb, other) > self.threshold
+
+    def update(self, frame):
+        thumb = thumbnail(frame, self.thumb_size)
+        if self._differs(thumb, self._previous):
+            self._stable_count = 0
+            self._moved = self._previous is not None
+        else:
+            self._stable_count += 1
+        self._previous = thumb
+        if self._stable_count < self.stable_frames:
+            return False
+        if not self._differs(thumb, self._scanned) and not (self.rearm_on_motion and self._moved):
+            return False
+        self._scanned = thumb
+        self._moved = False
+        return True
+
+
+class PollScheduler:
+    # Spaces polls so that grab + diff + scan work stays within cpu_budget of
+    # wall time, never polling faster than max_rate per second.
+    def __init__(self, max_rate=DEFAULT_MAX_RATE, cpu_budget=DEFAULT_CPU_BUDGET):
+        self.max_rate = max_rate
+        self.cpu_budget = cpu_budget
+        self._busy_average = 0.0
+
+    def record(self, busy_seconds):
+        self._busy_average = 0.7 * self._busy_average + 0.3 * busy_seconds
+
+    def next_interval(self):
+        return max(1.0 / self.max_rate, self._busy_average / self.cpu_budget)
+
+    def next_interval_ms(self):
+        return int(self.next_interval() * 1000)